@@ -1,6 +1,18 @@
+from collections import ChainMap
 from dataclasses import dataclass
 import itertools
-from typing import Any, Callable, Iterable, Literal, Optional, Union
+import math
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Union,
+)
 
 from jinja2.exceptions import TemplateError
 
@@ -13,8 +25,8 @@ from .validations import (
     BulkDefinitionSchema,
 )
 from .dimensions import get_dimension_values
-from .utils import version_tuple
-from .template import Template
+from .utils import TRUTHY_VALUES, version_tuple
+from .template import Template, render_layered
 
 
 def apply_template(obj: BulkDefinitionChild, template: BulkDefinitionChildTemplate):
@@ -63,6 +75,54 @@ def apply_template(obj: BulkDefinitionChild, template: BulkDefinitionChildTempla
     return obj
 
 
+def get_constant_parent_name_match(parent_name_match: str) -> Optional[bool]:
+    """Evaluate a parent name match which is plain text, returns None if it is a template."""
+    if "{" in str(parent_name_match):
+        return None
+    return str(parent_name_match).lower() in TRUTHY_VALUES
+
+
+def compile_parent_name_match(
+    parent_name_match: str,
+) -> Callable[[Mapping[str, Any]], bool]:
+    """Compile a parent name match template once into a predicate.
+
+    Single expression templates like '{{par.dim.1|int > 2}}' are evaluated as native
+    jinja expressions, everything else is rendered and compared against the truthy values.
+    """
+
+    def raise_template_error(e: TemplateError):
+        raise ValueError(
+            f"Invalid generator template '{parent_name_match}'\nException: {e}"
+        )
+
+    # plain text does not depend on the context, evaluate it only once
+    if (is_match := get_constant_parent_name_match(parent_name_match)) is not None:
+        return lambda ctx: is_match
+
+    try:
+        template = Template(parent_name_match)
+        if (expression := template.compile_expression()) is None:
+            compiled_template = template.compile()
+    except TemplateError as e:
+        raise_template_error(e)
+
+    def match(ctx: Mapping[str, Any]) -> bool:
+        try:
+            if expression is not None:
+                value = expression(ctx)
+                if isinstance(value, bool):
+                    return value
+            else:
+                value = render_layered(compiled_template, ctx)
+        except TemplateError as e:
+            raise_template_error(e)
+
+        return str(value).lower() in TRUTHY_VALUES
+
+    return match
+
+
 class DimStr(str):
     """String that also has a len attribute."""
 
@@ -92,19 +152,149 @@ FieldType = Union[
 ParseChildReturnElement = tuple[dict[str, str], list["ParseChildReturnType"]]
 ParseChildReturnType = list[ParseChildReturnElement]
 
+ParseChildIterElement = tuple[dict[str, str], Iterator["ParseChildIterElement"]]
+ParseChildIterType = Iterator[ParseChildIterElement]
+
+
+class LazyValues(Mapping[str, Any]):
+    """Generated values of a row, which are only rendered when they are accessed."""
+
+    __slots__ = ("_render", "_ctx", "_values")
+
+    def __init__(
+        self, render: Callable[[Mapping[str, Any]], dict[str, Any]], ctx: Mapping
+    ) -> None:
+        self._render = render
+        self._ctx = ctx
+        self._values: Optional[dict[str, Any]] = None
+
+    def _get_values(self) -> dict[str, Any]:
+        if self._values is None:
+            self._values = self._render(self._ctx)
+            self._render = self._ctx = None
+        return self._values
+
+    def __getitem__(self, key: str) -> Any:
+        return self._get_values()[key]
+
+    def __iter__(self):
+        return iter(self._get_values())
+
+    def __len__(self) -> int:
+        return len(self._get_values())
+
+    def __repr__(self) -> str:
+        return repr(self._get_values())
+
+
+class PreviewRecord(NamedTuple):
+    path: tuple[int, ...]
+    depth: int
+    generated: Mapping[str, Any]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Render the generated values and return the record as dict."""
+        return {
+            "path": list(self.path),
+            "depth": self.depth,
+            "generated": dict(self.generated),
+        }
+
+
+class PreparedChild(NamedTuple):
+    child: BulkDefinitionChild
+    render: Callable[[Mapping[str, Any]], dict[str, Any]]
+    dimensions: list[list[DimStr]]
+    child_matchers: list[tuple[BulkDefinitionChild, Callable[..., bool]]]
+
 
 class BulkGenerator:
     def __init__(self, inp, fields: dict[str, BaseFieldDefinition]):
         self.inp = inp
         self.schema: BulkDefinitionSchema = None
         self.fields = fields
+        self._prepared_childs: dict[int, PreparedChild] = {}
+        self._static_counts: dict[int, Optional[list[int]]] = {}
 
     def generate(self, parent_ctx: dict[str, Any] = {}):
         self.validate(apply_input=True)
         return self.parse_child(self.schema.output, parent_ctx)
 
+    def iter_generate(self, parent_ctx: dict[str, Any] = {}) -> ParseChildIterType:
+        """Lazily generate the output depth first.
+
+        Yields (generated_values, childs_iterator) tuples, items are only generated when
+        they are consumed, so memory is bounded by the tree depth instead of the node count.
+        """
+        self.validate(apply_input=True)
+        return self.iter_child(self.schema.output, parent_ctx)
+
+    def iter_preview(
+        self, parent_ctx: dict[str, Any] = {}, max_depth: Optional[int] = None
+    ) -> Iterator[PreviewRecord]:
+        """Lazily flatten the output depth first, up to max_depth levels.
+
+        The generated values of a record are only rendered when they are accessed,
+        or when a child template or parent_name_match depends on them.
+        """
+        if max_depth is not None and max_depth < 1:
+            raise ValueError("max_depth must be at least 1")
+
+        self.validate(apply_input=True)
+
+        stack = [((), enumerate(self.iter_child(self.schema.output, parent_ctx, True)))]
+        while stack:
+            parent_path, items = stack[-1]
+            if (item := next(items, None)) is None:
+                stack.pop()
+                continue
+
+            idx, (generated, childs) = item
+            path = (*parent_path, idx)
+            yield PreviewRecord(path, len(parent_path), generated)
+
+            if max_depth is None or len(path) < max_depth:
+                stack.append((path, enumerate(childs)))
+
+    def preview(
+        self,
+        parent_ctx: dict[str, Any] = {},
+        offset: int = 0,
+        limit: Optional[int] = None,
+        max_depth: Optional[int] = None,
+    ) -> dict[str, Any]:
+        """Render a window of the depth first flattened output.
+
+        The total is counted without rendering, and only the records inside the window are rendered.
+        """
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+        if max_depth is not None and max_depth < 1:
+            raise ValueError("max_depth must be at least 1")
+
+        levels = self.count(parent_ctx)["levels"]
+        total = sum(levels[:max_depth])
+
+        end = offset + limit if limit is not None else None
+        records = itertools.islice(
+            self.iter_preview(parent_ctx, max_depth), offset, end
+        )
+        results = [record.to_dict() for record in records]
+
+        return {"total": total, "offset": offset, "limit": limit, "results": results}
+
+    def count(self, parent_ctx: dict[str, Any] = {}) -> dict[str, Any]:
+        """Count the output nodes per level and in total, without rendering the generated values where possible."""
+        self.validate(apply_input=True)
+        levels = self.count_child(self.schema.output, parent_ctx)
+        return {"total": sum(levels), "levels": levels}
+
     def validate(self, apply_input=False):
         self.schema = BulkDefinitionSchema(**self.inp, apply_input=apply_input)
+        self._prepared_childs = {}
+        self._static_counts = {}
 
         version = version_tuple(self.schema.version)
         curr_version = version_tuple(PLUGIN_VERSION)
@@ -120,9 +310,13 @@ class BulkGenerator:
     def parse_child(
         self, child: BulkDefinitionChild, parent_ctx: dict[str, Any] = {}
     ) -> ParseChildReturnType:
-        res = []
-        child_ctx = []
+        def materialize(items: ParseChildIterType) -> ParseChildReturnType:
+            return [(generated, materialize(childs)) for generated, childs in items]
+
+        return materialize(self.iter_child(child, parent_ctx))
 
+    def resolve_child(self, child: BulkDefinitionChild) -> BulkDefinitionChild:
+        """Merge the extended template and the base child into the child definition."""
         # merge extend template
         if child.extends:
             template = next(
@@ -133,35 +327,6 @@ class BulkGenerator:
 
             child = apply_template(child, template)
 
-        # generate
-        render = self.compile_generate_fields(
-            self.fields, child.generate, child.global_context
-        )
-        product = []
-        dimensions = []
-        if len(child.dimensions) > 0:
-            dimensions = self.get_dimensions(child.dimensions, child.count)
-            dimensions = [list(enumerate(x)) for x in dimensions]
-            product = list(itertools.product(*dimensions, repeat=1))
-        else:
-            # no dimensions
-            product = [()]
-
-        # get length from dimensions
-        dimension_lens = list(map(len, dimensions))
-
-        default_context = self.get_default_context()
-        ctx = {"par": parent_ctx, "len": len(product)}
-        for idx, p in enumerate(product):
-            dim = {
-                (i + 1): DimStr(x, length=dimension_lens[i], idx=dim_idx)
-                for i, (dim_idx, x) in enumerate(p)
-            }
-            product_ctx = {**default_context, **ctx, "dim": dim, "idx": idx}
-            generate_values = render(**product_ctx)
-            res.append((generate_values, []))
-            child_ctx.append({**ctx, "dim": dim, "gen": generate_values})
-
         # merge child/childs
         if child.child:
             # define base_child template
@@ -176,35 +341,150 @@ class BulkGenerator:
             if len(child.childs) == 0:
                 child.childs.append(base_child)
 
-        # parse childs
-        for i, generated in enumerate(res):
-            has_matched = False
+        return child
+
+    def prepare_child(self, child: BulkDefinitionChild) -> PreparedChild:
+        """Resolve and compile a child definition.
+
+        This does not depend on the parent context, so it is only done once per child definition.
+        """
+        if (prepared := self._prepared_childs.get(id(child), None)) is not None:
+            return prepared
+
+        resolved_child = self.resolve_child(child)
+
+        # generate
+        render = self.compile_generate_fields(
+            self.fields, resolved_child.generate, resolved_child.global_context
+        )
+        dimensions = []
+        if len(resolved_child.dimensions) > 0:
+            dimensions = [
+                [DimStr(x, length=len(values), idx=i) for i, x in enumerate(values)]
+                for values in self.get_dimensions(
+                    resolved_child.dimensions, resolved_child.count
+                )
+            ]
+
+        # compile parent name matchers only once per child
+        child_matchers = [
+            (c, compile_parent_name_match(c.parent_name_match))
+            for c in resolved_child.childs
+        ]
+
+        prepared = PreparedChild(resolved_child, render, dimensions, child_matchers)
+        self._prepared_childs[id(child)] = prepared
+        return prepared
+
+    def iter_rows(
+        self,
+        child: BulkDefinitionChild,
+        parent_ctx: dict[str, Any] = {},
+        lazy: bool = False,
+    ) -> Iterator[
+        tuple[Mapping[str, Any], Mapping[str, Any], Optional[BulkDefinitionChild]]
+    ]:
+        """Generate the rows of a child as (generated_values, child_ctx, matched_child) tuples.
+
+        With lazy=True the values of a row are only rendered when they are accessed.
+        """
+        _, render, dimensions, child_matchers = self.prepare_child(child)
+
+        # without dimensions the product yields one empty tuple
+        dimension_keys = range(1, len(dimensions) + 1)
+        product = itertools.product(*dimensions, repeat=1)
+
+        # the static layers are shared between all rows, only the row layer is allocated per row
+        default_context = self.get_default_context()
+        ctx = {"par": parent_ctx, "len": math.prod(map(len, dimensions))}
+        static_ctx = {**default_context, **ctx}
+        for idx, p in enumerate(product):
+            dim = dict(zip(dimension_keys, p))
+            row_ctx = ChainMap({"dim": dim, "idx": idx}, static_ctx)
+            if lazy:
+                generate_values = LazyValues(render, row_ctx)
+            else:
+                generate_values = render(row_ctx)
+            # the parent context is a plain dict, so filters like to_json work on it
+            child_ctx = {**ctx, "dim": dim, "gen": generate_values}
 
             # search for matching child
-            for c in child.childs:
-                try:
-                    match = (
-                        Template(c.parent_name_match)
-                        .compile()
-                        .render(**default_context, par=child_ctx[i])
-                    )
-                    if match.lower() not in ["1", "y", "yes", "t", "true", "ok", "on"]:
-                        continue
-                except TemplateError as e:
-                    raise ValueError(
-                        f"Invalid generator template '{c.parent_name_match}'\nException: {e}"
-                    )
+            matched_child = None
+            match_ctx = {**default_context, "par": child_ctx}
+            for c, match in child_matchers:
+                if match(match_ctx):
+                    matched_child = c
+                    break
+            else:
+                if len(child_matchers) > 0:
+                    raise ValueError("No match for " + generate_values["name"])
+
+            yield generate_values, child_ctx, matched_child
+
+    def iter_child(
+        self,
+        child: BulkDefinitionChild,
+        parent_ctx: dict[str, Any] = {},
+        lazy: bool = False,
+    ) -> ParseChildIterType:
+        """Generate the child rows, with lazy=True the values of a row are only rendered on access."""
+        for generate_values, child_ctx, matched_child in self.iter_rows(
+            child, parent_ctx, lazy
+        ):
+            childs = iter(())
+            if matched_child is not None:
+                childs = self.iter_child(matched_child, child_ctx, lazy)
+
+            yield generate_values, childs
+
+    def get_static_counts(self, child: BulkDefinitionChild) -> Optional[list[int]]:
+        """Get the node counts per level of a child, if they do not depend on the context.
 
-                has_matched = True
+        This is the case if every row matches the same child, because all parent_name_match
+        templates before the first matching one are constant.
+        """
+        if (key := id(child)) in self._static_counts:
+            return self._static_counts[key]
+
+        _, _, dimensions, child_matchers = self.prepare_child(child)
+        row_count = math.prod(map(len, dimensions))
+
+        counts = None
+        if len(child_matchers) == 0:
+            counts = [row_count]
+        else:
+            for c, _ in child_matchers:
+                is_match = get_constant_parent_name_match(c.parent_name_match)
+                if is_match is None:
+                    break
+                if is_match:
+                    if (child_counts := self.get_static_counts(c)) is not None:
+                        counts = [row_count, *(row_count * x for x in child_counts)]
+                    break
+
+        self._static_counts[key] = counts
+        return counts
+
+    def count_child(
+        self, child: BulkDefinitionChild, parent_ctx: dict[str, Any] = {}
+    ) -> list[int]:
+        """Count the nodes per level of a child, rows are only rendered if a parent_name_match depends on them."""
+        if (counts := self.get_static_counts(child)) is not None:
+            return counts
 
-                # add child items if child found
-                res[i][1].extend(self.parse_child(c, child_ctx[i]))
-                break
+        counts = [0]
+        for _, child_ctx, matched_child in self.iter_rows(child, parent_ctx, True):
+            counts[0] += 1
+            if matched_child is None:
+                continue
 
-            if not has_matched and len(child.childs) > 0:
-                raise ValueError("No match for " + generated[0]["name"])
+            for i, c in enumerate(self.count_child(matched_child, child_ctx), 1):
+                if i < len(counts):
+                    counts[i] += c
+                else:
+                    counts.append(c)
 
-        return res
+        return counts
 
     def get_dimensions(
         self, dimensions: BulkDefinitionChildDimensions, count: BulkDefinitionChildCount
@@ -271,8 +551,8 @@ class BulkGenerator:
                     )
 
                 # prepare render function
-                def render(**ctx):
-                    v = compiled_template.render(**ctx)
+                def render(ctx: Mapping[str, Any]):
+                    v = render_layered(compiled_template, ctx)
                     if field.required and v == "":
                         raise ValueError(
                             f"'{path_str}' is a required field, but template '{generate}' returned empty string"
@@ -306,10 +586,10 @@ class BulkGenerator:
                 return [recursive_map(func, v, [*path, i]) for i, v in enumerate(d)]
             return func(d, path)
 
-        def render(**ctx):
+        def render(ctx: Mapping[str, Any]):
             try:
                 return recursive_map(
-                    lambda x, path: x(**ctx) if x else None, compiled_templates
+                    lambda x, path: x(ctx) if x else None, compiled_templates
                 )
             except TemplateError as e:
                 raise ValueError(f"Exception: {e}")
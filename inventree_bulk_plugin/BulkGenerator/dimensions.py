@@ -1,23 +1,48 @@
-import itertools
 import re
-from typing import Iterable, Tuple, Union
+from typing import Iterable, NamedTuple, Tuple, Union
 
+from .cache import CacheInfo, LRUCache
 from .generators import GENERATORS
 from .generators.generator import Generator, GeneratorTypes
 
 
-def parse_dimension(
-    dimension: str,
-) -> list[tuple[GeneratorTypes, Union[str, tuple[str, str]], dict, str]]:
-    res = []
-    for gen_match in re.finditer(
-        r"(?:(?:(\w+)-(\w+))|(\*?.+?))(?:\((.*?)\))?(?:,|$)", dimension
-    ):
+dimension_re = re.compile(r"(?:(?:(\w+)-(\w+))|(\*?.+?))(?:\((.*?)\))?(?:,|$)")
+setting_re = re.compile(r"([A-Za-z_]+?)(?:=)([^=]+)(?:,|$)")
+
+# process wide caches for parsed dimensions and generator class lookups
+DIMENSION_CACHE_SIZE = 1024
+dimension_cache = LRUCache(maxsize=DIMENSION_CACHE_SIZE)
+generator_cache = LRUCache(maxsize=DIMENSION_CACHE_SIZE)
+
+
+class FrozenSettings(dict):
+    """Dict that cannot be modified, because parsed dimensions are shared via the cache."""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("parsed generator settings are immutable")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+class ParsedGenerator(NamedTuple):
+    gen_type: GeneratorTypes
+    gen: Union[str, tuple[str, str]]
+    settings: FrozenSettings
+    gen_name: str
+
+
+def parse_dimension(dimension: str) -> tuple[ParsedGenerator, ...]:
+    return dimension_cache.get_or_set(
+        dimension, lambda: tuple(_parse_dimension(dimension))
+    )
+
+
+def _parse_dimension(dimension: str) -> Iterable[ParsedGenerator]:
+    for gen_match in dimension_re.finditer(dimension):
         settings = {}
         if gen_match.group(4):
-            for setting_match in re.finditer(
-                r"([A-Za-z_]+?)(?:=)([^=]+)(?:,|$)", gen_match.group(4)
-            ):
+            for setting_match in setting_re.finditer(gen_match.group(4)):
                 settings[setting_match.group(1)] = setting_match.group(2)
 
         # decide if word/infinity generator or start-end is given
@@ -32,9 +57,9 @@ def parse_dimension(
             gen = (gen_match.group(1), gen_match.group(2))
             gen_type = GeneratorTypes.RANGE
 
-        res.append((gen_type, gen, settings, gen_match.group(0).rstrip(",")))
-
-    return res
+        yield ParsedGenerator(
+            gen_type, gen, FrozenSettings(settings), gen_match.group(0).rstrip(",")
+        )
 
 
 def match_generator(
@@ -42,15 +67,34 @@ def match_generator(
     gen_type: GeneratorTypes,
     gen: Union[str, Tuple[str, str]],
 ) -> Union[Generator, None]:
-    for generator in generators:
-        if gen_type == GeneratorTypes.INFINITY and generator.NAME == gen:
-            return generator
-        elif gen_type == GeneratorTypes.RANGE and generator.is_generator(*gen):
-            return generator
+    generators = tuple(generators)
+
+    if gen_type == GeneratorTypes.INFINITY:
+        # lookup table by NAME, the first generator with a name wins
+        generators_by_name = generator_cache.get_or_set(
+            ("name", generators),
+            lambda: {
+                g.NAME: g for g in reversed(generators) if isinstance(g.NAME, str)
+            },
+        )
+        return generators_by_name.get(gen, None)
+
+    if gen_type == GeneratorTypes.RANGE:
+        return generator_cache.get_or_set(
+            ("range", generators, gen),
+            lambda: next((g for g in generators if g.is_generator(*gen)), None),
+        )
 
     return None
 
 
+def get_dimension_cache_info() -> dict[str, CacheInfo]:
+    return {
+        "parse_dimension": dimension_cache.cache_info(),
+        "match_generator": generator_cache.cache_info(),
+    }
+
+
 def get_dimension_values(
     dimension: str, global_count: Union[int, None]
 ) -> Iterable[str]:
@@ -59,10 +103,10 @@ def get_dimension_values(
     for gen_type, gen, settings, gen_name in parsed_dimension:
         if gen_type == GeneratorTypes.WORD:
 
-            def generator():
-                yield gen
+            def get_word_values(start_idx, end_idx, step, word=gen):
+                return [word][start_idx:end_idx:step]
 
-            seq.append((generator(), 0, 1, 1))
+            seq.append((get_word_values, 0, 1, 1, gen_name))
         else:
             gen_class = match_generator(GENERATORS, gen_type, gen)
 
@@ -95,16 +139,11 @@ def get_dimension_values(
 
             step = gen_instance.settings.step
 
-            seq.append((gen_instance.generator(), start_idx, end_idx, step))
+            seq.append((gen_instance.get_values, start_idx, end_idx, step, gen_name))
 
-    # generate result, islice objects with no end will take all available space to generate global_count elements
+    # generate result, generators with no end will take all available space to generate global_count elements
     res = []
-    for (generator, start_idx, end_idx, step), (
-        gen_type,
-        gen,
-        settings,
-        gen_name,
-    ) in zip(seq, parsed_dimension):
+    for get_values, start_idx, end_idx, step, gen_name in seq:
         length = None
         if None not in [start_idx, end_idx]:
             length = (end_idx - start_idx) * step
@@ -120,6 +159,7 @@ def get_dimension_values(
 
             end_idx = min(start_idx + remaining_items * step, end_idx or float("inf"))
 
-        res.extend(itertools.islice(generator, start_idx, end_idx, step))
+        # values are computed directly by their index, so only emitted values are generated
+        res.extend(get_values(start_idx, end_idx, step))
 
     return res
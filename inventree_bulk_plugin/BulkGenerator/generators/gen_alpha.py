@@ -53,6 +53,18 @@ class AlphaGenerator(Generator):
             for p in itertools.product(self.letters, repeat=i):
                 yield "".join(p)
 
+    def unrank(self, index):
+        # bijective base-26 representation of the one-based index
+        res = []
+        n = index + 1
+        while n > 0:
+            n, remainder = divmod(n - 1, len(self.letters))
+            res.append(self.letters[remainder])
+        return "".join(reversed(res))
+
+    def get_values(self, start_idx, end_idx, step):
+        return self.get_values_by_index(start_idx, end_idx, step)
+
     @classmethod
     def _get_alpha_index(cls, x: str) -> int:
         """Return the zero-based index of alphanumeric values."""
@@ -1,5 +1,8 @@
 import itertools
 from typing import Optional
+
+from pydantic import Field
+
 from .generator import Generator, BaseSettingsSchema
 
 
@@ -8,6 +11,8 @@ class NumericGenerator(Generator):
 
     class SettingsSchema(BaseSettingsSchema):
         start: Optional[int] = 1
+        width: Optional[int] = None
+        pad: str = Field("0", min_length=1, max_length=1)
 
     @staticmethod
     def is_generator(start_value, end_value):
@@ -17,4 +22,15 @@ class NumericGenerator(Generator):
         return int(value)
 
     def generator(self):
-        return (str(i) for i in itertools.count())
+        return (self.format(i) for i in itertools.count())
+
+    def unrank(self, index):
+        return self.format(index)
+
+    def get_values(self, start_idx, end_idx, step):
+        return [self.format(i) for i in range(start_idx, end_idx, step)]
+
+    def format(self, value: int) -> str:
+        if self.settings.width is None:
+            return str(value)
+        return str(value).rjust(self.settings.width, self.settings.pad)
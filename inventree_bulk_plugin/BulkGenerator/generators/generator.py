@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import itertools
 from typing import Iterable
 from typing import Dict, Optional, Tuple, Union
 from pydantic import BaseModel
@@ -53,3 +54,21 @@ class Generator(ABC):
     @abstractmethod
     def generator() -> Iterable[str]:
         pass  # pragma: no cover
+
+    def unrank(self, index: int) -> str:
+        """Return the value at a zero-based index in the generator, inverse of get_index.
+
+        Generators should override this with a direct computation, this fallback walks the generator.
+        """
+        return next(itertools.islice(self.generator(), index, None))
+
+    def get_values(self, start_idx: int, end_idx: int, step: int) -> list[str]:
+        """Return the values from start_idx up to (excluding) end_idx with step.
+
+        Generators that implement unrank can override this with get_values_by_index.
+        """
+        return list(itertools.islice(self.generator(), start_idx, end_idx, step))
+
+    def get_values_by_index(self, start_idx: int, end_idx: int, step: int) -> list[str]:
+        """Compute only the emitted values directly by their index."""
+        return [self.unrank(i) for i in range(start_idx, end_idx, step)]
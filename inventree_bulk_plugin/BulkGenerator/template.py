@@ -1,7 +1,15 @@
 import csv
 import json
 import io
+import re
+from collections import ChainMap
+from typing import Any, Mapping
+
 from jinja2 import Environment
+from jinja2 import Template as JinjaTemplate
+from jinja2.exceptions import TemplateSyntaxError
+
+from .cache import LRUCache
 
 
 def to_csv(value, **kwargs):
@@ -17,8 +25,15 @@ def from_csv(value, **kwargs):
     return list(csv.DictReader(io.StringIO(value), **kwargs))
 
 
+def json_default(value):
+    # mappings like lazily rendered generated values are serialized as dict
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
 def to_json(value, **kwargs):
-    return json.dumps(value, **kwargs)
+    return json.dumps(value, **{"default": json_default, **kwargs})
 
 
 def from_json(value, **kwargs):
@@ -39,6 +54,28 @@ env = Environment(
 )
 env.filters.update(template_filters)
 
+# process wide cache for compiled templates, keyed by template source and globals identity
+TEMPLATE_CACHE_SIZE = 1024
+template_cache = LRUCache(maxsize=TEMPLATE_CACHE_SIZE)
+
+# matches templates that only consist of a single {{ ... }} block without whitespace control
+single_expression_re = re.compile(
+    r"^\{\{(?![-+])(?P<expression>(?:(?!\{\{|\}\}).)*)(?<![-+])\}\}$", re.DOTALL
+)
+
+
+def render_layered(template: JinjaTemplate, *layers: Mapping[str, Any]) -> str:
+    """Render a compiled template with a layered context.
+
+    Unlike jinja's Template.render, the layers are not copied into a new dict,
+    so static context layers can be shared between many renders.
+    """
+    context = template.new_context(ChainMap(*layers, template.globals), shared=True)
+    try:
+        return template.environment.concat(template.root_render_func(context))
+    except Exception:
+        template.environment.handle_exception()
+
 
 class Template:
     def __init__(self, template_str: str, **kwargs) -> None:
@@ -50,4 +87,35 @@ class Template:
         return True
 
     def compile(self):
-        return env.from_string(str(self.template_str), self.ctx)
+        template_str = str(self.template_str)
+
+        # the compiled template keeps a reference to its globals, so the ids of
+        # the globals cannot be reused by other objects while the entry is cached
+        key = (template_str, tuple((k, id(v)) for k, v in self.ctx.items()))
+
+        return template_cache.get_or_set(
+            key, lambda: env.from_string(template_str, self.ctx)
+        )
+
+    def compile_expression(self):
+        """Compile a template that only consists of a single expression block.
+
+        The returned callable evaluates to the native python value of the expression
+        instead of rendering it to a string. Returns None if the template is no single
+        expression, in that case the template needs to be compiled via compile().
+        """
+        template_str = str(self.template_str)
+
+        if not (match := single_expression_re.match(template_str)):
+            return None
+
+        try:
+            return template_cache.get_or_set(
+                ("expression", template_str),
+                lambda: env.compile_expression(
+                    match.group("expression"), undefined_to_none=False
+                ),
+            )
+        except TemplateSyntaxError:
+            # e.g. tuples are valid inside of an output block, but not as expression
+            return None
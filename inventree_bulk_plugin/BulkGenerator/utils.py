@@ -2,26 +2,15 @@ def version_tuple(v: str):
     return tuple(map(int, v.split(".")))
 
 
+TRUTHY_VALUES = frozenset(["1", "y", "yes", "t", "true", "ok", "on"])
+FALSY_VALUES = frozenset(["0", "n", "no", "f", "false", "off"])
+
+
 def str2bool(text):
     string = str(text).lower()
-    if string in [
-        "1",
-        "y",
-        "yes",
-        "t",
-        "true",
-        "ok",
-        "on",
-    ]:
+    if string in TRUTHY_VALUES:
         return True
-    elif string in [
-        "0",
-        "n",
-        "no",
-        "f",
-        "false",
-        "off",
-    ]:
+    elif string in FALSY_VALUES:
         return False
 
     raise ValueError(
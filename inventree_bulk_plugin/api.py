@@ -1,5 +1,8 @@
+import itertools
 import json
+from typing import Iterator, Optional
 
+from django.http import StreamingHttpResponse
 from django.urls import path
 from rest_framework import permissions, status
 from rest_framework.authentication import (
@@ -7,22 +10,28 @@ from rest_framework.authentication import (
     BasicAuthentication,
     TokenAuthentication,
 )
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.generics import (
+    ListCreateAPIView,
+    RetrieveAPIView,
+    RetrieveUpdateDestroyAPIView,
+)
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.request import Request
 
 from InvenTree.filters import SEARCH_ORDER_FILTER
 
-from .bulkcreate_objects import bulkcreate_objects
+from .bulkcreate_objects import BulkCreateObject, bulkcreate_objects
+from .jobs import create_job, resume_job
 from .serializers import (
+    BulkCreationJobSerializer,
     TemplateSerializer,
     BulkCreateObjectSerializer,
     BulkCreateObjectDetailSerializer,
 )
-from .models import BulkCreationTemplate
-from .BulkGenerator.utils import str2bool
-from .BulkGenerator.BulkGenerator import BulkGenerator
+from .models import BulkCreationJob, BulkCreationTemplate
+from .BulkGenerator.utils import str2bool, str2int
+from .BulkGenerator.BulkGenerator import BulkGenerator, PreviewRecord
 
 
 # Fix csrf
@@ -84,11 +93,94 @@ class TemplateDetail(RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
+def stream_preview(
+    bulkcreate_object: BulkCreateObject, records: Iterator[PreviewRecord]
+) -> Iterator[str]:
+    """Render each preview record as one json line, errors are reported as last line."""
+    with bulkcreate_object.cache_model_instances():
+        try:
+            for record in records:
+                yield json.dumps(record.to_dict(), default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+
+def get_preview_window(query_params) -> tuple[int, Optional[int], Optional[int]]:
+    """Parse the offset, limit and depth query parameters of a preview."""
+    window = {}
+    for key, minimum in [("offset", 0), ("limit", 0), ("depth", 1)]:
+        value = query_params.get(key, None)
+        if value is None:
+            window[key] = None
+            continue
+
+        window[key] = str2int(value)
+        if window[key] is None or window[key] < minimum:
+            raise ValueError(f"'{key}' must be an integer >= {minimum}")
+
+    return window["offset"] or 0, window["limit"], window["depth"]
+
+
+class BulkCreationJobDetail(RetrieveAPIView):
+    """API detail endpoint for BulkCreationJob objects.
+
+    - GET: return the status of a BulkCreationJob
+    """
+
+    serializer_class = BulkCreationJobSerializer
+
+    authentication_classes = authentication_classes
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        # users can only see their own jobs
+        if self.request.user.is_superuser:
+            return BulkCreationJob.objects.all()
+        return BulkCreationJob.objects.filter(user=self.request.user)
+
+
+class BulkCreationJobResume(APIView):
+    """API endpoint to resume a failed BulkCreationJob.
+
+    - POST: run a failed job again, chunked jobs continue after their last committed chunk
+    """
+
+    authentication_classes = authentication_classes
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request: Request, pk: int):
+        # users can only resume their own jobs
+        jobs = BulkCreationJob.objects.all()
+        if not request.user.is_superuser:
+            jobs = jobs.filter(user=request.user)
+
+        job = jobs.filter(pk=pk).first()
+        if job is None:
+            return Response(
+                {"error": f"Job with id '{pk}' not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        try:
+            resume_job(job)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            BulkCreationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+
 class BulkCreate(APIView):
     """API endpoint for bulk creating and previewing schemas.
 
     - GET: get all objects that can be bulk generated and their fields
-    - POST: bulk generate / preview objects
+    - POST: bulk generate / preview objects, with background=true the objects are created by a background job
+      (with chunk_size=n committed in chunks of n top level objects, so failed jobs can be resumed)
+      and with offset/limit/depth only a window of the depth first flattened preview is returned,
+      with stream=true the flattened preview is streamed as newline delimited json
+      and with count=true only the number of objects per level is returned,
+      with create=true and profile=true the queries, inserted rows and time per phase are returned as well
     """
 
     authentication_classes = authentication_classes
@@ -121,6 +213,9 @@ class BulkCreate(APIView):
 
     def post(self, request: Request):
         create_objects = str2bool(request.query_params.get("create", "false"))
+        background = str2bool(request.query_params.get("background", "false"))
+        stream = str2bool(request.query_params.get("stream", "false"))
+        count = str2bool(request.query_params.get("count", "false"))
         template_type = request.data.get("template_type", None)
         schema = request.data.get("template", None)
 
@@ -142,25 +237,84 @@ class BulkCreate(APIView):
 
         try:
             bulkcreate_object = bulkcreate_object_class(request)
-
-            ctx = bulkcreate_object.get_context()
-
-            if not isinstance(schema, dict):
-                schema = json.loads(schema)
-            bg = BulkGenerator(schema, fields=bulkcreate_object.fields).generate(ctx)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # only create if create query param is set
-        if create_objects:
+        # model instances referenced by the generated objects are resolved once per request
+        with bulkcreate_object.cache_model_instances():
             try:
-                objects = bulkcreate_object.create_objects(bg)
-                return Response(
-                    [obj.pk for obj in objects], status=status.HTTP_201_CREATED
-                )
-            except Exception as e:  # pragma: no cover
+                ctx = bulkcreate_object.get_context()
+
+                if not isinstance(schema, dict):
+                    schema = json.loads(schema)
+                bulk_generator = BulkGenerator(schema, fields=bulkcreate_object.fields)
+
+                # validate the schema here and enqueue the job, objects are generated and created in the job
+                if create_objects and background:
+                    bulk_generator.validate()
+                    job = create_job(
+                        template_type,
+                        schema,
+                        {
+                            k: v
+                            for k, v in request.query_params.items()
+                            if k != "background"
+                        },
+                        request.user,
+                    )
+                    return Response({"job_id": job.pk}, status=status.HTTP_202_ACCEPTED)
+
+                # objects get created while they are generated, to not hold the whole tree in memory
+                if create_objects:
+                    bg = bulk_generator.iter_generate(ctx)
+                elif count:
+                    bg = bulk_generator.count(ctx)
+                elif stream:
+                    _, _, depth = get_preview_window(request.query_params)
+                    records = bulk_generator.iter_preview(ctx, depth)
+
+                    # the first record is rendered here, so that invalid schemas still return a 400 error
+                    first_record = next(records, None)
+                    if first_record is not None:
+                        first_record.to_dict()
+                        records = itertools.chain([first_record], records)
+
+                    return StreamingHttpResponse(
+                        stream_preview(bulkcreate_object, records),
+                        content_type="application/x-ndjson",
+                    )
+                elif any(
+                    k in request.query_params for k in ["offset", "limit", "depth"]
+                ):
+                    # only render a window of the depth first flattened preview
+                    offset, limit, depth = get_preview_window(request.query_params)
+                    bg = bulk_generator.preview(
+                        ctx, offset=offset, limit=limit, max_depth=depth
+                    )
+                else:
+                    bg = bulk_generator.generate(ctx)
+            except Exception as e:
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+            # only create if create query param is set
+            if create_objects:
+                try:
+                    profile = bulkcreate_object.profile
+                    with profile.record():
+                        objects = bulkcreate_object.create_objects(profile.track(bg))
+
+                    pks = [obj.pk for obj in objects]
+                    if str2bool(request.query_params.get("profile", "false")):
+                        return Response(
+                            {"created": pks, "profile": profile.to_dict()},
+                            status=status.HTTP_201_CREATED,
+                        )
+                    return Response(pks, status=status.HTTP_201_CREATED)
+                except Exception as e:
+                    return Response(
+                        {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+                    )
+
         return Response(bg)
 
 
@@ -168,4 +322,10 @@ api_urls = [
     path("templates/<int:pk>", TemplateDetail.as_view(), name="api-detail-templates"),
     path("templates", TemplateList.as_view(), name="api-list-templates"),
     path("bulkcreate", BulkCreate.as_view(), name="api-bulk-create"),
+    path("jobs/<int:pk>", BulkCreationJobDetail.as_view(), name="api-detail-jobs"),
+    path(
+        "jobs/<int:pk>/resume",
+        BulkCreationJobResume.as_view(),
+        name="api-resume-jobs",
+    ),
 ]
@@ -1,13 +1,24 @@
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import cached_property
-import io
 import re
-import requests
 import json
 from dataclasses import dataclass
-from typing import Any, Callable, Generic, Literal, Optional, TypeVar, Union
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    Literal,
+    NamedTuple,
+    Optional,
+    TypeVar,
+    Union,
+)
 from pathlib import Path
-from django.db import transaction
-from django.db.models import Model
+from django.db import connection, transaction
+from django.db.models import Model, Q, QuerySet
 from django.contrib.contenttypes.models import ContentType
 from django.apps import apps
 from django.urls import reverse
@@ -29,12 +40,16 @@ from company.models import Company, ManufacturerPart, SupplierPart
 from stock.models import StockItem
 from common.models import InvenTreeSetting
 from InvenTree.status_codes import StockStatus
-from InvenTree.helpers_model import download_image_from_url
+from InvenTree.helpers import constructPathString, str2bool as inventree_str2bool
+from InvenTree.config import get_config_file
 from plugin import registry
 
+from .downloads import DownloadCache, DownloadedImage, Downloader, close_file
+from .profiling import BulkCreateProfile
 from .BulkGenerator.utils import str2bool, str2int, str2float
 from .BulkGenerator.BulkGenerator import (
     BaseFieldDefinition,
+    ParseChildIterType,
     ParseChildReturnElement,
     ParseChildReturnType,
 )
@@ -56,6 +71,59 @@ def get_model(model_name: str):
     return model
 
 
+class ModelInstanceCache:
+    """Memoizes model instance lookups for the duration of a bulk create request.
+
+    Only found instances are cached, so objects which get created during the
+    request can still be resolved afterwards.
+    """
+
+    def __init__(self) -> None:
+        self.instances: dict[tuple, Model] = {}
+
+    @staticmethod
+    def get_key(model: type[Model], filters: dict, limit_choices: dict) -> tuple:
+        return (
+            model,
+            json.dumps(filters, sort_keys=True, default=str),
+            json.dumps(limit_choices, sort_keys=True, default=str),
+        )
+
+    def get(self, model: type[Model], filters: dict, limit_choices: dict) -> Model:
+        key = self.get_key(model, filters, limit_choices)
+        if (instance := self.instances.get(key, None)) is None:
+            instance = model.objects.get(**filters, **limit_choices)
+            self.instances[key] = instance
+        return instance
+
+    def prefetch(self, model: type[Model], pks: Iterable[str], limit_choices: dict):
+        """Fetch all instances by pk with a single query."""
+        int_pks = set()
+        for pk in pks:
+            try:
+                int_pks.add(int(pk))
+            except (TypeError, ValueError):
+                pass
+
+        missing_pks = [
+            pk
+            for pk in int_pks
+            if self.get_key(model, {"pk": pk}, limit_choices) not in self.instances
+        ]
+        if len(missing_pks) == 0:
+            return
+
+        for pk, instance in (
+            model.objects.filter(**limit_choices).in_bulk(missing_pks).items()
+        ):
+            self.instances[self.get_key(model, {"pk": pk}, limit_choices)] = instance
+
+
+model_instance_cache: ContextVar[Optional[ModelInstanceCache]] = ContextVar(
+    "model_instance_cache", default=None
+)
+
+
 def get_model_instance(
     model: Model, pk: str, limit_choices={}, error_msg="", allow_multiple=False
 ):
@@ -74,6 +142,8 @@ def get_model_instance(
     try:
         if allow_multiple:
             return model.objects.filter(**filters, **limit_choices)
+        if cache := model_instance_cache.get():
+            return cache.get(model, filters, limit_choices)
         return model.objects.get(**filters, **limit_choices)
     except model.DoesNotExist:
         raise ValueError(
@@ -98,8 +168,8 @@ def cast_model(value: str, *, field: "FieldDefinition" = None):
 
 
 def cast_select(value: str, *, field: "FieldDefinition" = None, create=False):
-    options = field.options or field.get_options()
-    if value not in options.keys():
+    options, option_keys = field.get_cached_options()
+    if value not in option_keys:
         raise ValueError(
             f"'{value}' is not a valid option, choose one of: {', '.join(options.keys())}."
         )
@@ -135,6 +205,8 @@ class FieldDefinition(BaseFieldDefinition):
     }
 
     def __post_init__(self):
+        self._cached_options: Optional[tuple[dict[str, str], frozenset[str]]] = None
+
         if self.cast_func is None and (
             cast_func := self.type_casts.get(self.field_type, None)
         ):
@@ -149,6 +221,13 @@ class FieldDefinition(BaseFieldDefinition):
                 raise ValueError(f"Model '{self.model[0]}' not found.")
             self.model = (self.model[0], self.model[1], model_class)
 
+    def get_cached_options(self) -> tuple[dict[str, str], frozenset[str]]:
+        """Get the options and a set of their keys, get_options is only called once per field definition."""
+        if self._cached_options is None:
+            options = self.options or self.get_options()
+            self._cached_options = (options, frozenset(options.keys()))
+        return self._cached_options
+
     def get_api_url(self):
         if not self.model:
             return None
@@ -183,18 +262,66 @@ class BulkCreateObject(Generic[ModelType]):
     name: str  # pragma: no cover
     template_type: str  # pragma: no cover
     generate_type: Literal["tree", "single"] = "tree"
+    supports_bulk_insert: bool = False
+    bulk_insert_batch_size: int = 1000
     model: ModelType  # pragma: no cover
     fields: Optional[dict[str, FieldDefinition]]  # pragma: no cover
     get_fields: Optional[Callable[[], dict[str, FieldDefinition]]]  # pragma: no cover
 
     def __init__(self, request: Request) -> None:
         self.request = request
+        self.model_instance_cache = ModelInstanceCache()
+        self.profile = BulkCreateProfile()
 
         if hasattr(self, "get_fields"):
             self.fields = self.get_fields()
 
-    def create_object(self, data: ParseChildReturnElement, **kwargs):
-        """Create an objects, the properties from data can override the kwargs."""
+    @contextmanager
+    def cache_model_instances(self):
+        """Memoize all get_model_instance lookups of this bulk create object while active."""
+        token = model_instance_cache.set(self.model_instance_cache)
+        try:
+            yield self.model_instance_cache
+        finally:
+            model_instance_cache.reset(token)
+
+    def prefetch_model_instances(self, objects: ParseChildReturnType):
+        """Fetch all model instances referenced by pk with one query per model.
+
+        Only already generated objects are collected, lazily generated childs are skipped.
+        """
+        pks: dict[tuple, set] = {}
+
+        def collect(fields: dict[str, FieldDefinition], data: dict[str, Any]):
+            for k, v in data.items():
+                if v is None or not (field := fields.get(k, None)):
+                    continue
+                collect_field(field, v)
+
+        def collect_field(field: FieldDefinition, value: Any):
+            if field.field_type == "model" and field.model and field.model[2]:
+                if not field.allow_multiple:
+                    _, limit_choices, model = field.model
+                    key = (model, json.dumps(limit_choices, sort_keys=True))
+                    pks.setdefault(key, (limit_choices, set()))[1].add(value)
+            elif field.field_type == "object" and isinstance(value, dict):
+                collect(field.fields, value)
+            elif field.field_type == "list" and isinstance(value, list):
+                for item in value:
+                    collect_field(field.items_type, item)
+
+        stack = [objects]
+        while stack:
+            for data, childs in stack.pop():
+                collect(self.fields, data)
+                if isinstance(childs, list):
+                    stack.append(childs)
+
+        for (model, _), (limit_choices, model_pks) in pks.items():
+            self.model_instance_cache.prefetch(model, model_pks, limit_choices)
+
+    def get_properties(self, data: ParseChildReturnElement) -> dict[str, Any]:
+        """Get the model properties from the generated data, resolving model fields to their instances."""
         properties = {}
         for k, v in data[0].items():
             if field := self.fields.get(k, None):
@@ -203,10 +330,22 @@ class BulkCreateObject(Generic[ModelType]):
                     v = get_model_instance(model, v, limit_choices)
                 properties[k] = v
 
-        return self.model.objects.create(**{**kwargs, **properties})
+        return properties
 
-    def create_objects(self, objects: ParseChildReturnType) -> list[ModelType]:
+    def create_object(self, data: ParseChildReturnElement, **kwargs):
+        """Create an objects, the properties from data can override the kwargs."""
+        obj = self.model.objects.create(**{**kwargs, **self.get_properties(data)})
+        self.profile.add_rows(self.model)
+        return obj
+
+    def create_objects(
+        self, objects: Union[ParseChildReturnType, ParseChildIterType]
+    ) -> list[ModelType]:
+        """Create all objects, objects can also be lazily generated via BulkGenerator.iter_generate."""
         if self.generate_type == "tree":
+            if self.use_bulk_insert():
+                return self.bulk_create_tree(objects)
+
             created_objects = []
 
             def recursive_bulk_create(parent: ModelType, childs: ParseChildReturnType):
@@ -217,19 +356,119 @@ class BulkCreateObject(Generic[ModelType]):
                     recursive_bulk_create(obj, c[1])
 
             with transaction.atomic():
-                recursive_bulk_create(self.parent, objects)
+                with self.profile.phase("insert"):
+                    recursive_bulk_create(self.parent, objects)
+                with self.profile.phase("relations"):
+                    self.create_related_objects()
             return created_objects
 
         if self.generate_type == "single":
             created_objects = []
 
             with transaction.atomic():
-                for o in objects:
-                    created_objects.append(self.create_object(o))
+                with self.profile.phase("insert"):
+                    for o in objects:
+                        created_objects.append(self.create_object(o))
+                with self.profile.phase("relations"):
+                    self.create_related_objects()
             return created_objects
 
         return []  # pragma: no cover
 
+    def create_related_objects(self):
+        """Create related objects collected by create_object, after all objects are created in the same transaction."""
+        pass
+
+    def bulk_create_models(self, model: type[Model], objs: list[Model]) -> list[Model]:
+        """Save objects one by one, or insert them in chunks if bulk inserts are requested.
+
+        Bulk inserts skip save(), post_save signals and events of the objects.
+        """
+        self.profile.add_rows(model, len(objs))
+        if not self.bulk_insert_requested():
+            for obj in objs:
+                obj.save()
+            return objs
+
+        return model.objects.bulk_create(objs, batch_size=self.bulk_insert_batch_size)
+
+    def use_bulk_insert(self) -> bool:
+        """Check if the tree should be created level by level via bulk_create.
+
+        This is opt-in via the bulk_insert query parameter, because no save() hooks
+        and signals are run for the created objects. The database needs to return the
+        primary keys of bulk inserted rows, otherwise the children cannot reference their parent.
+        """
+        return self.supports_bulk_insert and self.bulk_insert_requested()
+
+    def bulk_insert_requested(self) -> bool:
+        """Check if bulk inserts are requested via the bulk_insert query parameter and supported by the database."""
+        return (
+            str2bool(self.request.query_params.get("bulk_insert", "false"))
+            and connection.features.can_return_rows_from_bulk_insert
+        )
+
+    def bulk_create_tree(
+        self, objects: Union[ParseChildReturnType, ParseChildIterType]
+    ) -> list[ModelType]:
+        """Create a tree of objects with one bulk insert per tree level.
+
+        The mptt fields are only set to placeholders on insert, and the tree of
+        the parent gets rebuilt once after all levels are inserted. The created
+        objects are returned in the same (depth first) order as create_objects does.
+        """
+        mptt_opts = self.model._mptt_meta
+        parent = self.parent
+        parent_path = [p.name for p in parent.get_ancestors(include_self=True)]
+        parent_level = getattr(parent, mptt_opts.level_attr)
+        tree_id = getattr(parent, mptt_opts.tree_id_attr)
+
+        # each level holds (parent object, parent path, generated childs, created childs of the parent)
+        root_nodes: list[tuple[ModelType, list]] = []
+        level = [(parent, parent_path, objects, root_nodes)]
+        depth = 0
+
+        with transaction.atomic(), self.profile.phase("insert"):
+            while level:
+                depth += 1
+                level_objects = []
+                next_level = []
+
+                for par, path, childs, nodes in level:
+                    for c in childs:
+                        obj = self.model(**{"parent": par, **self.get_properties(c)})
+                        obj_path = [*path, obj.name]
+                        obj.pathstring = constructPathString(obj_path)
+                        setattr(obj, mptt_opts.tree_id_attr, tree_id)
+                        setattr(obj, mptt_opts.level_attr, parent_level + depth)
+                        setattr(obj, mptt_opts.left_attr, 0)
+                        setattr(obj, mptt_opts.right_attr, 0)
+
+                        child_nodes = []
+                        nodes.append((obj, child_nodes))
+                        level_objects.append(obj)
+                        next_level.append((obj, obj_path, c[1], child_nodes))
+
+                self.model.objects.bulk_create(
+                    level_objects, batch_size=self.bulk_insert_batch_size
+                )
+                self.profile.add_rows(self.model, len(level_objects))
+                level = next_level
+
+            self.model.objects.partial_rebuild(tree_id)
+            with self.profile.phase("relations"):
+                self.create_related_objects()
+
+        # flatten the created tree in depth first order
+        created_objects = []
+        stack = list(reversed(root_nodes))
+        while stack:
+            obj, child_nodes = stack.pop()
+            created_objects.append(obj)
+            stack.extend(reversed(child_nodes))
+
+        return created_objects
+
     def get_context(self) -> dict:
         if self.generate_type == "tree":
             parent_id = self.request.query_params.get("parent_id", None)
@@ -264,6 +503,7 @@ class StockLocationBulkCreateObject(BulkCreateObject[StockLocation]):
     name = "Stock Location"
     template_type = "STOCK_LOCATION"
     generate_type = "tree"
+    supports_bulk_insert = True
     model = StockLocation
 
     fields = {
@@ -282,6 +522,7 @@ class PartCategoryBulkCreateObject(BulkCreateObject[PartCategory]):
     name = "Part Category"
     template_type = "PART_CATEGORY"
     generate_type = "tree"
+    supports_bulk_insert = True
     model = PartCategory
 
     fields = {
@@ -298,12 +539,103 @@ class PartCategoryBulkCreateObject(BulkCreateObject[PartCategory]):
     }
 
 
+@dataclass
+class PartCreateSettings:
+    """Snapshot of all settings which are used while creating parts, read once per bulk creation."""
+
+    skip_duplicate_fields: list[str]
+    default_download_headers: dict[str, str]
+    image_max_size: int
+    image_headers: dict[str, str]
+    download_concurrency: int
+    download_concurrency_per_host: int
+    download_spool_threshold: int
+    download_max_total_size: Optional[int]
+    download_cache_size: Optional[int]
+    download_cache_dir: str
+
+    @classmethod
+    def load(cls) -> "PartCreateSettings":
+        plugin = registry.get_plugin("inventree-bulk-plugin")
+
+        # define fields that should be skipped for duplicating
+        skip_duplicate_fields = [
+            "parameters",
+            "attachments",
+            "supplier",
+            "manufacturer",
+            "stock",
+            "related_parts",
+            "category",
+            "variant_of",
+            "is_template",
+        ]
+        if not InvenTreeSetting.get_setting("PART_ALLOW_DUPLICATE_IPN"):
+            skip_duplicate_fields.append("IPN")
+
+        image_headers = {}
+        if user_agent := InvenTreeSetting.get_setting(
+            "INVENTREE_DOWNLOAD_FROM_URL_USER_AGENT", ""
+        ):
+            image_headers["User-Agent"] = user_agent
+
+        # sizes are configured in MB, 0 disables the limit or cache
+        max_total_size = str2int(plugin.get_setting("DOWNLOAD_MAX_TOTAL_SIZE"), 0)
+        cache_size = str2int(plugin.get_setting("DOWNLOAD_CACHE_SIZE"), 0)
+
+        return cls(
+            skip_duplicate_fields=skip_duplicate_fields,
+            default_download_headers=json.loads(
+                plugin.get_setting("DEFAULT_DOWNLOAD_HEADERS")
+            ),
+            image_max_size=int(
+                InvenTreeSetting.get_setting("INVENTREE_DOWNLOAD_IMAGE_MAX_SIZE", 1)
+            )
+            * 1024
+            * 1024,
+            image_headers=image_headers,
+            download_concurrency=str2int(plugin.get_setting("DOWNLOAD_CONCURRENCY"), 8),
+            download_concurrency_per_host=str2int(
+                plugin.get_setting("DOWNLOAD_CONCURRENCY_PER_HOST"), 4
+            ),
+            download_spool_threshold=str2int(
+                plugin.get_setting("DOWNLOAD_SPOOL_THRESHOLD"), 5
+            )
+            * 1024
+            * 1024,
+            download_max_total_size=max_total_size * 1024 * 1024
+            if max_total_size > 0
+            else None,
+            download_cache_size=cache_size * 1024 * 1024 if cache_size > 0 else None,
+            download_cache_dir=plugin.get_setting("DOWNLOAD_CACHE_DIR"),
+        )
+
+
+class VariantParentSnapshot(NamedTuple):
+    values: dict[str, Any]
+    parameters: list[Parameter]
+
+
 class PartBulkCreateObject(BulkCreateObject[Part]):
     name = "Part"
     template_type = "PART"
     generate_type = "tree"
     model = Part
 
+    def __init__(self, request: Request) -> None:
+        super().__init__(request)
+
+        # relations are collected while the parts are created and created after all parts are created
+        self.pending_parameters: dict[int, list[Parameter]] = {}
+        self.pending_manufacturer_parts: list[ManufacturerPart] = []
+        self.pending_supplier_parts: list[SupplierPart] = []
+        self.pending_stock_items: list[StockItem] = []
+        self.pending_related_parts: list[tuple[Part, list[str]]] = []
+        self.parameter_templates: dict[Any, ParameterTemplate] = {}
+        self.related_part_queries: dict[str, QuerySet] = {}
+        self.settings: Optional[PartCreateSettings] = None
+        self.parent_snapshots: dict[int, VariantParentSnapshot] = {}
+
     def get_fields(self):
         return {
             "name": FieldDefinition("Name", required=True),
@@ -496,66 +828,101 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
             ),
         }
 
-    def create_objects(self, objects: ParseChildReturnType) -> list[Part]:
-        # download images outside of db transaction
-        self.part_images = {}
+    def create_objects(
+        self, objects: Union[ParseChildReturnType, ParseChildIterType]
+    ) -> list[Part]:
+        # the top level parts are needed multiple times for downloading, child variants are still created lazily
+        objects = list(objects)
+
+        # collect images and attachments which need to be downloaded
+        image_urls = []
+        attachment_downloads = {}
         for part_data in objects:
             if url := part_data[0].get("image", None):
                 # check if image is relative
-                if not re.match(r"^(?:[a-z+]+:)?//", url):
-                    continue
+                if re.match(r"^(?:[a-z+]+:)?//", url):
+                    image_urls.append(url)
+
+            for attachment_data in part_data[0].get("attachments", []):
+                if attachment_data.get("link", None) and attachment_data.get(
+                    "file_url", None
+                ):
+                    raise ValueError("Either provide a link or an attachment.")
+
+                file_url = attachment_data.get("file_url", None)
+                if file_url and file_url not in attachment_downloads:
+                    attachment_downloads[file_url] = attachment_data
+
+        # settings are only read once per bulk creation
+        self.settings = PartCreateSettings.load()
+        part_settings = self.settings
+
+        def download_image(downloader: Downloader, url: str):
+            return downloader.download_image(
+                url, part_settings.image_max_size, part_settings.image_headers
+            )
 
-                # check if image has already been downloaded
-                if url in self.part_images:
-                    continue
+        def download_attachment(downloader: Downloader, file_url: str):
+            attachment_data = attachment_downloads[file_url]
+            headers = json.loads(attachment_data.get("file_headers", "{}"))
+            file = downloader.download_file(
+                file_url, headers={**part_settings.default_download_headers, **headers}
+            )
+            filename = attachment_data.get("file_name", None) or file_url.split("/")[-1]
+            return File(file, filename)
+
+        # download images and attachments in parallel outside of db transaction
+        with self.profile.phase("downloads"):
+            with Downloader(
+                max_workers=part_settings.download_concurrency,
+                max_per_host=part_settings.download_concurrency_per_host,
+                spool_threshold=part_settings.download_spool_threshold,
+                max_total_size=part_settings.download_max_total_size,
+                cache=self.get_download_cache(part_settings),
+            ) as downloader:
+                self.part_images = downloader.download_all(image_urls, download_image)
+                self.attachments = downloader.download_all(
+                    list(attachment_downloads.keys()), download_attachment
+                )
 
-                self.part_images[url] = None
+        # downloaded attachments are spooled to temporary files, which are removed after the transaction
+        try:
+            with self.profile.phase("prefetch"):
+                self.prefetch_model_instances(objects)
+
+            return super().create_objects(objects)
+        finally:
+            for attachment in self.attachments.values():
+                close_file(attachment)
+
+    def get_download_cache(
+        self, part_settings: "PartCreateSettings"
+    ) -> Optional[DownloadCache]:
+        """Get the download cache which is shared between bulk creations, if it is enabled."""
+        if part_settings.download_cache_size is None:
+            return None
 
-                try:
-                    self.part_images[url] = download_image_from_url(
-                        part_data[0]["image"]
-                    )
-                except Exception as exc:
-                    raise ValueError(str(exc))
-
-        # download attachments outside of db transaction
-        self.attachments = {}
-        for attachment_data in [
-            a for p in objects for a in p[0].get("attachments", [])
-        ]:
-            if attachment_data.get("link", None) and attachment_data.get(
-                "file_url", None
-            ):
-                raise ValueError("Either provide a link or an attachment.")
-
-            file_url = attachment_data.get("file_url", None)
-            if file_url and file_url not in self.attachments:
-                try:
-                    default_headers = json.loads(
-                        registry.get_plugin("inventree-bulk-plugin").get_setting(
-                            "DEFAULT_DOWNLOAD_HEADERS"
-                        )
-                    )
-                    headers = json.loads(attachment_data.get("file_headers", "{}"))
-                    r = requests.get(
-                        file_url,
-                        allow_redirects=True,
-                        headers={**default_headers, **headers},
-                    )
-                    r.raise_for_status()
-                    filename = (
-                        attachment_data.get("file_name", None)
-                        or file_url.split("/")[-1]
-                    )
-                    self.attachments[file_url] = File(ContentFile(r.content), filename)
-                except Exception as e:
-                    raise ValueError(f"{e}")
+        return DownloadCache(
+            self.get_download_cache_dir(part_settings),
+            part_settings.download_cache_size,
+        )
+
+    def get_download_cache_dir(self, part_settings: "PartCreateSettings") -> Path:
+        if part_settings.download_cache_dir:
+            return Path(part_settings.download_cache_dir)
 
-        return super().create_objects(objects)
+        # default to a plugin directory next to the config file, which is neither served like
+        # the media directory nor world writable like the temp directory
+        return Path(get_config_file()).parent.joinpath(
+            "inventree-bulk-plugin", "downloads"
+        )
 
     def create_object(
         self, data: ParseChildReturnElement, *, parent: Optional[Part] = None
     ):
+        # the generated values are the par.gen context of lazily rendered childs, so only change a copy
+        data = (copy.deepcopy(data[0]), data[1])
+
         # remove relations from data to create them separately
         parameters = data[0].pop("parameters", [])
         attachments = data[0].pop("attachments", [])
@@ -564,21 +931,6 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
         stock_data = data[0].pop("stock", None)
         related_parts = data[0].pop("related_parts", None)
 
-        # define fields that should be skipped for duplicating
-        skip_duplicate_fields = [
-            "parameters",
-            "attachments",
-            "supplier",
-            "manufacturer",
-            "stock",
-            "related_parts",
-            "category",
-            "variant_of",
-            "is_template",
-        ]
-        if not InvenTreeSetting.get_setting("PART_ALLOW_DUPLICATE_IPN"):
-            skip_duplicate_fields.append("IPN")
-
         # check variant_of
         if parent:
             if not parent.is_template:
@@ -588,16 +940,9 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
             data[0]["variant_of"] = parent
 
             # copy everything from parent if not set
-            for k in self.fields:
-                if k not in data[0] and (value := getattr(parent, k, None)):
-                    # skip copying specific fields
-                    if k in skip_duplicate_fields:
-                        continue
-
-                    if k == "image":
-                        data[0][k] = value.name
-                    else:
-                        data[0][k] = value
+            for k, value in self.get_parent_snapshot(parent).values.items():
+                if k not in data[0]:
+                    data[0][k] = value
 
         # use local image if available
         image = data[0].pop("image", None)
@@ -606,8 +951,16 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
             if image in self.part_images and isinstance(self.part_images[image], str):
                 image = self.part_images[image]
             elif not re.match(r"^(?:[a-z+]+:)?//", image):
-                # try use local image
-                if not (Path(settings.MEDIA_ROOT.joinpath(image))).is_file():
+                # try use local image, cached downloads are no media files and may be evicted
+                media_root = Path(settings.MEDIA_ROOT).resolve()
+                image_path = media_root.joinpath(image).resolve()
+                cache_dir = self.get_download_cache_dir(self.settings).resolve()
+                in_media_root = image_path.is_relative_to(media_root)
+                if not in_media_root or image_path.is_relative_to(cache_dir):
+                    raise ValueError(
+                        f"Image '{image}' for part '{data[0]['name']}' is not a media file"
+                    )
+                if not image_path.is_file():
                     raise ValueError(
                         f"Image '{image}' for part '{data[0]['name']}' does not exist"
                     )
@@ -622,45 +975,45 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
 
         # use remote image if available
         if image and image in self.part_images:
-            remote_img = self.part_images[image]
-
-            fmt = remote_img.format or "PNG"
-            buffer = io.BytesIO()
-            remote_img.save(buffer, format=fmt)
+            remote_img: DownloadedImage = self.part_images[image]
 
             # Construct a simplified name for the image
-            filename = f"part_{part.pk}_image.{fmt.lower()}"
+            filename = f"part_{part.pk}_image.{remote_img.format.lower()}"
 
+            # the downloaded bytes are written unchanged
             part.image.save(
                 filename,
-                ContentFile(buffer.getvalue()),
+                ContentFile(remote_img.content),
             )
 
             # image has now been saved, update it to not save it again for the next part using the same url
             self.part_images[image] = part.image.name
 
-        # create parameters
+        # collect parameters
+        part_parameters = []
         if parent:
-            part.copy_parameters_from(parent)
+            part_parameters.extend(
+                Parameter(
+                    model_type=self.part_content_type,
+                    model_id=part.pk,
+                    template=p.template,
+                    data=p.data,
+                    note=p.note,
+                )
+                for p in self.get_parent_snapshot(parent).parameters
+            )
 
         for parameter in parameters:
-            template = get_model_instance(
-                ParameterTemplate, parameter["template"], {}, f"for {part.name}"
-            )
-            if (
-                template.model_type is not None
-                and template.model_type != self.part_content_type
-            ):
-                raise ValueError(
-                    f"Parameter template '{template.name}' is not valid for part model"
+            part_parameters.append(
+                Parameter(
+                    model_type=self.part_content_type,
+                    model_id=part.pk,
+                    template=self.get_parameter_template(parameter["template"], part),
+                    data=parameter["value"],
+                    note=parameter.get("note", ""),
                 )
-            Parameter.objects.create(
-                model_type=self.part_content_type,
-                model_id=part.pk,
-                template=template,
-                data=parameter["value"],
-                note=parameter.get("note", ""),
             )
+        self.pending_parameters[part.pk] = part_parameters
 
         # create attachments
         for attachment in attachments:
@@ -679,11 +1032,12 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
                 Company, manufacturer_pk, {"is_manufacturer": True}, f"for {part.name}"
             )
 
-            manufacturer_part = ManufacturerPart.objects.create(
+            manufacturer_part = ManufacturerPart(
                 part=part,
                 manufacturer=manufacturer,
                 **manufacturer_data,
             )
+            self.pending_manufacturer_parts.append(manufacturer_part)
 
         # create supplier part
         supplier_part = None
@@ -694,13 +1048,14 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
                 Company, supplier_pk, {"is_supplier": True}, f"for {part.name}"
             )
 
-            supplier_part = SupplierPart.objects.create(
+            supplier_part = SupplierPart(
                 part=part,
                 supplier=supplier,
                 manufacturer_part=manufacturer_part,
                 primary=_make_default,
                 **supplier_data,
             )
+            self.pending_supplier_parts.append(supplier_part)
 
         # create initial stock
         if stock_data:
@@ -709,29 +1064,146 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
                 StockLocation, location_pk, {}, f"for {part.name}"
             )
 
-            stock_item = StockItem(
-                part=part,
-                location=location,
-                supplier_part=supplier_part,
-                **stock_data,
+            self.pending_stock_items.append(
+                StockItem(
+                    part=part,
+                    location=location,
+                    supplier_part=supplier_part,
+                    **stock_data,
+                )
             )
-            stock_item.save(user=self.request.user)
 
-        # create related parts
+        # collect related parts, the filters are only evaluated once after all parts are created
         if related_parts:
-            # use set to filter out parts that are selected by multiple filters
-            related_parts_set = set()
             for related_part in related_parts:
-                related_parts_query = get_model_instance(
-                    Part, related_part, {}, f"for {part.name}", allow_multiple=True
-                ).exclude(pk=part.pk)
-                related_parts_set.update(related_parts_query)
-
-            for related_part in related_parts_set:
-                PartRelated.objects.create(part_1=part, part_2=related_part)
+                if related_part not in self.related_part_queries:
+                    self.related_part_queries[related_part] = get_model_instance(
+                        Part, related_part, {}, f"for {part.name}", allow_multiple=True
+                    )
+            self.pending_related_parts.append((part, related_parts))
 
         return part
 
+    def get_parent_snapshot(self, parent: Part) -> VariantParentSnapshot:
+        """Get the field values and parameters which variants copy from their parent, only read once per parent."""
+        if parent.pk not in self.parent_snapshots:
+            values = {}
+            for k in self.fields:
+                # skip copying specific fields
+                if k in self.settings.skip_duplicate_fields:
+                    continue
+
+                if value := getattr(parent, k, None):
+                    values[k] = value.name if k == "image" else value
+
+            # parents created in this run have their parameters not saved yet
+            if parent.pk in self.pending_parameters:
+                parameters = list(self.pending_parameters[parent.pk])
+            else:
+                parameters = list(parent.get_parameters().select_related("template"))
+
+            self.parent_snapshots[parent.pk] = VariantParentSnapshot(values, parameters)
+
+        return self.parent_snapshots[parent.pk]
+
+    def get_parameter_template(self, template_pk: Any, part: Part) -> ParameterTemplate:
+        """Resolve and validate a parameter template only once per bulk creation."""
+        if template_pk not in self.parameter_templates:
+            template = get_model_instance(
+                ParameterTemplate, template_pk, {}, f"for {part.name}"
+            )
+            if (
+                template.model_type is not None
+                and template.model_type != self.part_content_type
+            ):
+                raise ValueError(
+                    f"Parameter template '{template.name}' is not valid for part model"
+                )
+            self.parameter_templates[template_pk] = template
+
+        return self.parameter_templates[template_pk]
+
+    def create_related_objects(self):
+        parameters = [p for ps in self.pending_parameters.values() for p in ps]
+        self.pending_parameters = {}
+
+        if self.bulk_insert_requested():
+            # bulk_create skips save() and sends no post_save signals or events,
+            # so only the value conversion of Parameter.save() is run here
+            for parameter in parameters:
+                parameter.calculate_numeric_value()
+                if parameter.template.checkbox:
+                    parameter.data = inventree_str2bool(parameter.data)
+                    parameter.data_numeric = 1 if parameter.data else 0
+
+            Parameter.objects.bulk_create(
+                parameters, batch_size=self.bulk_insert_batch_size
+            )
+        else:
+            for parameter in parameters:
+                parameter.save()
+        self.profile.add_rows(Parameter, len(parameters))
+
+        # supplier parts link to the manufacturer parts, so these need to be inserted first
+        manufacturer_parts, self.pending_manufacturer_parts = (
+            self.pending_manufacturer_parts,
+            [],
+        )
+        self.bulk_create_models(ManufacturerPart, manufacturer_parts)
+
+        supplier_parts, self.pending_supplier_parts = self.pending_supplier_parts, []
+        if self.bulk_insert_requested():
+            # SupplierPart.save() validates and cleans the pack quantity, each new part only has one
+            # supplier part so there are no other primary supplier parts which need to be reset
+            for supplier_part in supplier_parts:
+                supplier_part.clean()
+        self.bulk_create_models(SupplierPart, supplier_parts)
+
+        # stock items are still saved one by one, because save() adds the tracking entry and updates the tree
+        stock_items, self.pending_stock_items = self.pending_stock_items, []
+        for stock_item in stock_items:
+            stock_item.save(user=self.request.user)
+        self.profile.add_rows(StockItem, len(stock_items))
+
+        self.create_related_parts()
+
+    def create_related_parts(self):
+        """Create all collected related parts, relations are unordered and only created once."""
+        related_parts, self.pending_related_parts = self.pending_related_parts, []
+        if not related_parts:
+            return
+
+        related_pks = {
+            key: set(query.values_list("pk", flat=True))
+            for key, query in self.related_part_queries.items()
+        }
+
+        relations: dict[tuple[int, int], tuple[int, int]] = {}
+        for part, keys in related_parts:
+            for key in keys:
+                for pk in related_pks[key]:
+                    if pk != part.pk:
+                        relations.setdefault(
+                            (min(part.pk, pk), max(part.pk, pk)), (part.pk, pk)
+                        )
+
+        # skip relations which already exist in any direction
+        part_pks = [part.pk for part, _ in related_parts]
+        for i in range(0, len(part_pks), self.bulk_insert_batch_size):
+            chunk = part_pks[i : i + self.bulk_insert_batch_size]
+            for part_1, part_2 in PartRelated.objects.filter(
+                Q(part_1__in=chunk) | Q(part_2__in=chunk)
+            ).values_list("part_1", "part_2"):
+                relations.pop((min(part_1, part_2), max(part_1, part_2)), None)
+
+        self.bulk_create_models(
+            PartRelated,
+            [
+                PartRelated(part_1_id=part_1, part_2_id=part_2)
+                for part_1, part_2 in relations.values()
+            ],
+        )
+
     def get_context(self) -> dict:
         parent_id = self.request.query_params.get("parent_id", None)
         self.category = None
@@ -830,6 +1302,7 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
                 attachment=attachment,
                 upload_user=self.request.user,
             )
+            self.profile.add_rows(Attachment)
             return
         except ImportError:  # pragma: no cover
             # fallback to the legacy attachment system
@@ -842,6 +1315,7 @@ class PartBulkCreateObject(BulkCreateObject[Part]):
                 attachment=attachment,
                 user=self.request.user,
             )
+            self.profile.add_rows(PartAttachment)
         except Exception as e:  # pragma: no cover
             raise e
 
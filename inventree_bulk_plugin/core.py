@@ -3,6 +3,7 @@ import os
 from dataclasses import dataclass
 
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from rest_framework.request import Request
 
 from plugin import InvenTreePlugin
@@ -55,7 +56,42 @@ class InvenTreeBulkPlugin(
             "description": "Set default download headers that should be used each time in json format",
             "default": "{}",
             "validator": validate_json,
-        }
+        },
+        "DOWNLOAD_CONCURRENCY": {
+            "name": "Download concurrency",
+            "description": "Maximum number of images and attachments that are downloaded in parallel",
+            "default": 8,
+            "validator": [int, MinValueValidator(1)],
+        },
+        "DOWNLOAD_CONCURRENCY_PER_HOST": {
+            "name": "Download concurrency per host",
+            "description": "Maximum number of parallel downloads from the same host",
+            "default": 4,
+            "validator": [int, MinValueValidator(1)],
+        },
+        "DOWNLOAD_SPOOL_THRESHOLD": {
+            "name": "Download memory threshold",
+            "description": "Size in MB up to which a downloaded attachment is kept in memory, larger attachments are written to a temporary file",
+            "default": 5,
+            "validator": [int, MinValueValidator(0)],
+        },
+        "DOWNLOAD_MAX_TOTAL_SIZE": {
+            "name": "Download total size limit",
+            "description": "Maximum size in MB of all images and attachments downloaded by one bulk creation, 0 disables the limit",
+            "default": 1024,
+            "validator": [int, MinValueValidator(0)],
+        },
+        "DOWNLOAD_CACHE_SIZE": {
+            "name": "Download cache size",
+            "description": "Size in MB of the on disk cache for downloaded images and attachments, which is shared between bulk creations. 0 disables the cache",
+            "default": 512,
+            "validator": [int, MinValueValidator(0)],
+        },
+        "DOWNLOAD_CACHE_DIR": {
+            "name": "Download cache directory",
+            "description": "Directory of the download cache, defaults to a plugin directory next to the config file. It must not be served by the webserver",
+            "default": "",
+        },
     }
 
     PREACT_PANELS: list[Panel] = [
@@ -0,0 +1,426 @@
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Hashable,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+from urllib.parse import urlparse
+
+import requests
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.validators import URLValidator
+from requests.adapters import HTTPAdapter
+from PIL import Image
+
+T = TypeVar("T", bound=Hashable)
+R = TypeVar("R")
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# same timeout as InvenTree's download_image_from_url
+IMAGE_DOWNLOAD_TIMEOUT = 2.5
+
+# blobs are named by the sha256 of their content
+BLOB_NAME_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# downloaded images in these formats are stored without re-encoding them
+KEEP_IMAGE_FORMATS = {"PNG", "JPEG", "GIF", "WEBP"}
+
+
+class DownloadedImage(NamedTuple):
+    content: bytes
+    format: str
+
+
+def close_file(file: Any):
+    """Close a downloaded file, if it can be closed."""
+    if isinstance(file, File):
+        file = file.file
+    if callable(close := getattr(file, "close", None)):
+        close()
+
+
+@dataclass
+class DownloadCacheEntry:
+    url: str
+    blob: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def get_validation_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DownloadCache:
+    """On disk cache for downloaded files, which is shared between bulk creations.
+
+    Entries are indexed by url and request headers and point to blobs named by the
+    sha256 of their content, so identical files are only stored once. Blobs are
+    evicted least recently used first, once the cache exceeds max_size.
+    """
+
+    def __init__(self, path: Union[str, Path], max_size: int) -> None:
+        self.path = Path(path)
+        self.max_size = max_size
+        self.index_path = self.path / "index"
+        self.blobs_path = self.path / "blobs"
+        # the cache is private to the plugin, other users must not be able to plant blobs
+        for path in (self.path, self.index_path, self.blobs_path):
+            path.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    @staticmethod
+    def get_key(url: str, headers: dict[str, str]) -> str:
+        key = json.dumps([url, sorted(headers.items())])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get_index_file(self, url: str, headers: dict[str, str]) -> Path:
+        return self.index_path / f"{self.get_key(url, headers)}.json"
+
+    def lookup(self, url: str, headers: dict[str, str]) -> Optional[DownloadCacheEntry]:
+        index_file = self.get_index_file(url, headers)
+        try:
+            entry = DownloadCacheEntry(**json.loads(index_file.read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+        # the blob may have been evicted, or the entry does not point to a blob name
+        if (
+            not BLOB_NAME_PATTERN.fullmatch(str(entry.blob))
+            or not (self.blobs_path / entry.blob).is_file()
+        ):
+            index_file.unlink(missing_ok=True)
+            return None
+
+        return entry
+
+    def open(
+        self, url: str, headers: dict[str, str], entry: DownloadCacheEntry
+    ) -> Optional[BinaryIO]:
+        """Open a cached blob, blobs which do not match their hash are dropped and None is returned."""
+        blob_file = self.blobs_path / entry.blob
+        try:
+            file = blob_file.open("rb")
+        except OSError:
+            return None
+
+        content_hash = hashlib.sha256()
+        while chunk := file.read(DOWNLOAD_CHUNK_SIZE):
+            content_hash.update(chunk)
+
+        if content_hash.hexdigest() != entry.blob:
+            file.close()
+            blob_file.unlink(missing_ok=True)
+            self.get_index_file(url, headers).unlink(missing_ok=True)
+            return None
+
+        os.utime(blob_file)
+        file.seek(0)
+        return file
+
+    def store(
+        self,
+        url: str,
+        headers: dict[str, str],
+        file: BinaryIO,
+        content_hash: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        """Store a downloaded file, only files which can be revalidated are cached."""
+        if not etag and not last_modified:
+            return
+
+        blob_file = self.blobs_path / content_hash
+        if blob_file.is_file():
+            os.utime(blob_file)
+        else:
+            self.write_atomic(blob_file, lambda f: shutil.copyfileobj(file, f))
+
+        entry = DownloadCacheEntry(url, content_hash, etag, last_modified)
+        index_file = self.get_index_file(url, headers)
+        self.write_atomic(
+            index_file, lambda f: f.write(json.dumps(asdict(entry)).encode())
+        )
+
+    def write_atomic(self, path: Path, write: Callable[[BinaryIO], Any]):
+        # write to a temporary file first, so that concurrent readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def prune(self):
+        """Remove the least recently used blobs until the cache fits into max_size."""
+        blobs = []
+        for blob_file in self.blobs_path.iterdir():
+            if blob_file.name.startswith("."):
+                continue
+            try:
+                stat = blob_file.stat()
+            except OSError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, blob_file))
+
+        total_size = sum(size for _, size, _ in blobs)
+        for _, size, blob_file in sorted(blobs):
+            if total_size <= self.max_size:
+                break
+            blob_file.unlink(missing_ok=True)
+            total_size -= size
+
+
+class Downloader:
+    """Download many urls concurrently with a shared session.
+
+    The total number of parallel downloads is limited by max_workers,
+    and the number of parallel downloads per host by max_per_host.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        max_per_host: int = 4,
+        timeout: float = 10,
+        image_timeout: float = IMAGE_DOWNLOAD_TIMEOUT,
+        spool_threshold: int = 5 * 1024 * 1024,
+        max_total_size: Optional[int] = None,
+        cache: Optional[DownloadCache] = None,
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_per_host = max(1, max_per_host)
+        self.timeout = timeout
+        self.image_timeout = image_timeout
+        self.spool_threshold = spool_threshold
+        self.max_total_size = max_total_size
+        self.total_size = 0
+        self.cache = cache
+
+        # keep enough connections alive for all workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers, pool_maxsize=self.max_workers
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_limits: dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def get_host_limit(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def download_all(
+        self,
+        items: Sequence[T],
+        fetch: Callable[["Downloader", T], R],
+        get_url: Callable[[T], str] = str,
+    ) -> dict[T, R]:
+        """Fetch all items in parallel and return the results by item.
+
+        If any fetch fails, a ValueError listing every failed url in the order
+        of the items is raised after all downloads are finished.
+        """
+
+        def run(item: T) -> R:
+            with self.get_host_limit(get_url(item)):
+                return fetch(self, item)
+
+        items = list(dict.fromkeys(items))
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, max(1, len(items))),
+            thread_name_prefix="inventree-bulk-plugin-download",
+        ) as executor:
+            futures = [(item, executor.submit(run, item)) for item in items]
+
+        results = {}
+        errors = []
+        for item, future in futures:
+            if (exc := future.exception()) is not None:
+                errors.append(f"{get_url(item)}: {exc}")
+            else:
+                results[item] = future.result()
+
+        if len(errors) > 0:
+            for result in results.values():
+                close_file(result)
+            raise ValueError("\n".join(errors))
+
+        return results
+
+    def close(self):
+        self.session.close()
+
+        # evict old blobs once after all downloads, instead of after every download
+        if self.cache:
+            self.cache.prune()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add_total_size(self, size: int):
+        with self._lock:
+            self.total_size += size
+            if (
+                self.max_total_size is not None
+                and self.total_size > self.max_total_size
+            ):
+                raise ValueError("Total download size exceeded maximum size")
+
+    def check_cached_file(
+        self, file: BinaryIO, max_size: Optional[int] = None
+    ) -> BinaryIO:
+        """Apply the same size limits to cached files as to downloaded files."""
+        try:
+            size = os.fstat(file.fileno()).st_size
+            if max_size is not None and size > max_size:
+                raise ValueError("File size is too large")
+            self.add_total_size(size)
+        except Exception:
+            file.close()
+            raise
+        return file
+
+    def download_file(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        max_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> BinaryIO:
+        """Download a file in chunks, it is only held in memory up to the spool threshold.
+
+        If a cache is set, cached files are revalidated with the server and read from
+        the cache if they have not been modified. The caller is responsible for closing the returned file.
+        """
+        headers = headers or {}
+        entry = self.cache.lookup(url, headers) if self.cache else None
+
+        file = SpooledTemporaryFile(max_size=self.spool_threshold)
+        try:
+            r = self.session.get(
+                url,
+                allow_redirects=True,
+                headers={
+                    **headers,
+                    **(entry.get_validation_headers() if entry else {}),
+                },
+                timeout=self.timeout if timeout is None else timeout,
+                stream=True,
+            )
+            with r:
+                if entry is not None and r.status_code == 304:
+                    file.close()
+                    r.close()
+                    cached_file = self.cache.open(url, headers, entry)
+                    if cached_file is not None:
+                        return self.check_cached_file(cached_file, max_size)
+
+                    # the cached blob did not match its hash and was dropped, download it again
+                    return self.download_file(url, headers, max_size, timeout)
+
+                r.raise_for_status()
+
+                try:
+                    content_length = int(r.headers.get("Content-Length", 0))
+                except ValueError:
+                    raise ValueError(
+                        "Server responded with invalid Content-Length value"
+                    )
+                if max_size is not None and content_length > max_size:
+                    raise ValueError("File size is too large")
+
+                content_hash = hashlib.sha256()
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if max_size is not None and file.tell() + len(chunk) > max_size:
+                        raise ValueError("File download exceeded maximum size")
+                    self.add_total_size(len(chunk))
+                    content_hash.update(chunk)
+                    file.write(chunk)
+
+                if self.cache:
+                    file.seek(0)
+                    self.cache.store(
+                        url,
+                        headers,
+                        file,
+                        content_hash.hexdigest(),
+                        etag=r.headers.get("ETag", None),
+                        last_modified=r.headers.get("Last-Modified", None),
+                    )
+        except Exception:
+            file.close()
+            raise
+
+        file.seek(0)
+        return file
+
+    def download_image(
+        self, url: str, max_size: int, headers: Optional[dict] = None
+    ) -> DownloadedImage:
+        """Download an image like InvenTree's download_image_from_url.
+
+        The url is validated and the image is downloaded with image_timeout and max_size.
+        The image is only verified and not decoded, so the original bytes can be stored
+        unchanged. Only formats which are not in KEEP_IMAGE_FORMATS are converted to png.
+        """
+        try:
+            URLValidator()(url)
+        except ValidationError:
+            raise ValueError(f"Invalid image url '{url}'")
+
+        with self.download_file(
+            url, headers, max_size=max_size, timeout=self.image_timeout
+        ) as file:
+            content = file.read()
+
+        if len(content) == 0:
+            raise ValueError("Remote server returned empty response")
+
+        try:
+            with Image.open(io.BytesIO(content)) as img:
+                fmt = img.format
+                img.verify()
+        except Exception:
+            raise TypeError("Supplied URL is not a valid image file")
+
+        if fmt in KEEP_IMAGE_FORMATS:
+            return DownloadedImage(content, fmt)
+
+        buffer = io.BytesIO()
+        with Image.open(io.BytesIO(content)) as img:
+            img.convert().save(buffer, format="PNG")
+        return DownloadedImage(buffer.getvalue(), "PNG")
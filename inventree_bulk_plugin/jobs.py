@@ -0,0 +1,223 @@
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Iterable
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from InvenTree.status import is_worker_running
+from InvenTree.tasks import offload_task
+
+from .bulkcreate_objects import bulkcreate_objects
+from .models import BulkCreationJob
+from .BulkGenerator.BulkGenerator import BulkGenerator, ParseChildIterType
+from .BulkGenerator.utils import str2int
+
+# used if no background worker is running, to not block the request
+local_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="inventree-bulk-plugin"
+)
+
+PROGRESS_UPDATE_INTERVAL = 100
+PROGRESS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# jobs stay running if their process dies, they can be resumed if they did not commit progress within this timeout
+STALE_JOB_TIMEOUT = timedelta(hours=24)
+
+
+@dataclass
+class JobRequest:
+    """Stand-in for the rest framework request, bulk create objects only need these attributes."""
+
+    user: Any
+    query_params: dict[str, str] = field(default_factory=dict)
+    data: dict[str, Any] = field(default_factory=dict)
+
+
+def get_progress_cache_key(job_id: int) -> str:
+    return f"inventree_bulk_plugin:job:{job_id}:generated"
+
+
+def get_job_progress(job: BulkCreationJob) -> int:
+    """Get the number of generated objects, running jobs report their progress via the cache.
+
+    The objects of a job are created in one transaction, so progress written to the
+    job itself would not be visible until the job is finished.
+    """
+    if job.status == BulkCreationJob.Status.RUNNING:
+        return cache.get(get_progress_cache_key(job.pk), job.generated)
+    return job.generated
+
+
+def compress_pk_ranges(
+    pks: Iterable[int], ranges: Iterable[list[int]] = ()
+) -> list[list[int]]:
+    """Compress pks into a sorted list of inclusive [start, end] ranges, merged with already compressed ranges."""
+    merged: list[list[int]] = []
+    for start, end in sorted([*([s, e] for s, e in ranges), *([pk, pk] for pk in pks)]):
+        if merged and merged[-1][1] + 1 >= start:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class JobProgress:
+    """Count the generated objects while they are lazily created."""
+
+    def __init__(self, job: BulkCreationJob) -> None:
+        self.job = job
+        self.generated = 0
+
+    def track(self, objects: ParseChildIterType) -> ParseChildIterType:
+        for data, childs in objects:
+            self.generated += 1
+            if self.generated % PROGRESS_UPDATE_INTERVAL == 0:
+                self.flush()
+            yield data, self.track(childs)
+
+    def flush(self):
+        cache.set(
+            get_progress_cache_key(self.job.pk),
+            self.generated,
+            timeout=PROGRESS_CACHE_TIMEOUT,
+        )
+
+
+def create_job(
+    template_type: str, schema: dict, query_params: dict[str, str], user: Any
+) -> BulkCreationJob:
+    """Store a validated bulk creation request as job and enqueue it once it is committed."""
+    job = BulkCreationJob.objects.create(
+        template_type=template_type,
+        template=json.dumps(schema),
+        query_params=query_params,
+        user=user if user and user.is_authenticated else None,
+    )
+    transaction.on_commit(lambda: enqueue_job(job.pk))
+    return job
+
+
+def enqueue_job(job_id: int):
+    """Run the job via the InvenTree background worker, or a local thread if no worker is running."""
+    if is_worker_running():
+        offload_task(run_job, job_id, force_async=True)
+    else:
+        local_executor.submit(run_local_job, job_id)
+
+
+def resume_job(job: BulkCreationJob):
+    """Run a failed or stale job again, chunked jobs continue after their last committed chunk.
+
+    Running jobs are stale if they did not commit progress within STALE_JOB_TIMEOUT.
+    """
+    resumable = Q(status=BulkCreationJob.Status.FAILURE) | Q(
+        status=BulkCreationJob.Status.RUNNING,
+        heartbeat_at__lt=timezone.now() - STALE_JOB_TIMEOUT,
+    )
+
+    # the status is changed atomically, so a job which just committed progress is not resumed
+    resumed = BulkCreationJob.objects.filter(resumable, pk=job.pk).update(
+        status=BulkCreationJob.Status.PENDING, error="", finished_at=None
+    )
+    job.refresh_from_db()
+    if resumed == 0:
+        raise ValueError(
+            f"Only failed jobs can be resumed, job is {job.status.lower()}"
+        )
+
+    transaction.on_commit(lambda: enqueue_job(job.pk))
+
+
+def run_local_job(job_id: int):
+    try:
+        run_job(job_id)
+    finally:
+        # the thread owns its own database connection, which is not reused by requests
+        connection.close()
+
+
+def run_job(job_id: int):
+    """Generate and create all objects of a job and store the result on the job."""
+    # claim the job atomically, so it is never run twice if it is enqueued twice
+    now = timezone.now()
+    claimed = BulkCreationJob.objects.filter(
+        pk=job_id, status=BulkCreationJob.Status.PENDING
+    ).update(status=BulkCreationJob.Status.RUNNING, started_at=now, heartbeat_at=now)
+    if claimed == 0:
+        return
+
+    job = BulkCreationJob.objects.get(pk=job_id)
+
+    # objects of committed chunks were generated before
+    progress = JobProgress(job)
+    progress.generated = job.created
+    try:
+        schema = json.loads(job.template)
+        request = JobRequest(
+            user=job.user,
+            query_params=job.query_params,
+            data={"template_type": job.template_type, "template": schema},
+        )
+        bulkcreate_object = bulkcreate_objects[job.template_type](request)
+
+        chunk_size = str2int(job.query_params.get("chunk_size", None), 0)
+
+        with bulkcreate_object.cache_model_instances():
+            ctx = bulkcreate_object.get_context()
+            bulk_generator = BulkGenerator(schema, fields=bulkcreate_object.fields)
+            objects = bulk_generator.iter_generate(ctx)
+
+            if chunk_size > 0:
+                create_chunks(
+                    job,
+                    bulkcreate_object,
+                    progress.track(itertools.islice(objects, job.checkpoint, None)),
+                    chunk_size,
+                )
+            else:
+                created_objects = bulkcreate_object.create_objects(
+                    progress.track(objects)
+                )
+                job.created = len(created_objects)
+                job.created_pks = compress_pk_ranges(obj.pk for obj in created_objects)
+
+        job.status = BulkCreationJob.Status.SUCCESS
+    except Exception as e:
+        job.error = str(e)
+        job.status = BulkCreationJob.Status.FAILURE
+    finally:
+        job.generated = progress.generated
+        job.finished_at = timezone.now()
+        job.save()
+        cache.delete(get_progress_cache_key(job.pk))
+
+
+def create_chunks(
+    job: BulkCreationJob,
+    bulkcreate_object,
+    objects: ParseChildIterType,
+    chunk_size: int,
+):
+    """Create the objects in chunks of top level objects, which are committed one by one.
+
+    The number of committed top level objects is stored as checkpoint on the job in the
+    same transaction, so a failed job can be resumed after the last committed chunk.
+    """
+    while chunk := list(itertools.islice(objects, chunk_size)):
+        with transaction.atomic():
+            created_objects = bulkcreate_object.create_objects(chunk)
+            job.checkpoint += len(chunk)
+            job.created += len(created_objects)
+            job.created_pks = compress_pk_ranges(
+                (obj.pk for obj in created_objects), job.created_pks
+            )
+            job.heartbeat_at = timezone.now()
+            job.save(
+                update_fields=["checkpoint", "created", "created_pks", "heartbeat_at"]
+            )
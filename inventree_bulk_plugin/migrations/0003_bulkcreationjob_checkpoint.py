@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventree_bulk_plugin", "0002_bulkcreationjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bulkcreationjob",
+            name="checkpoint",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventree_bulk_plugin", "0003_bulkcreationjob_checkpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bulkcreationjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
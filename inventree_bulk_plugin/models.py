@@ -1,5 +1,6 @@
 import json
 
+from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
 
@@ -29,3 +30,36 @@ class BulkCreationTemplate(models.Model):
     template = models.TextField(validators=[validate_template])
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+
+class BulkCreationJob(models.Model):
+    """Store bulk creation jobs which run in the background."""
+
+    class Meta:
+        app_label = "inventree_bulk_plugin"
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        SUCCESS = "SUCCESS", "Success"
+        FAILURE = "FAILURE", "Failure"
+
+    template_type = models.CharField(max_length=100)
+    template = models.TextField()
+    query_params = models.JSONField(default=dict)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    generated = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    created_pks = models.JSONField(default=list)
+    checkpoint = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # updated whenever a running job commits progress, to detect jobs whose process died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+from typing import Any
+
+from django.db import connection
+from django.db.models import Model
+
+from .BulkGenerator.BulkGenerator import ParseChildIterType
+
+
+class BulkCreateProfile:
+    """Record executed queries, inserted rows and the time spent per phase of a bulk creation.
+
+    Phases can be nested, the time of a nested phase is only counted for the nested phase.
+    """
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_time = 0.0
+        self.wall_time = 0.0
+        self.phases: dict[str, float] = {}
+        self.rows: dict[str, int] = {}
+        self._stack: list[list[Any]] = []
+
+    @contextmanager
+    def record(self):
+        """Record all queries executed on the default database connection while active."""
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self.execute_wrapper):
+                yield self
+        finally:
+            self.wall_time += time.perf_counter() - start
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+    @contextmanager
+    def phase(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            self.add_phase_time(self._stack[-1], now)
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.add_phase_time(self._stack.pop(), now)
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def add_phase_time(self, entry: list[Any], now: float):
+        name, start = entry
+        self.phases[name] = self.phases.get(name, 0.0) + now - start
+
+    def track(self, objects: ParseChildIterType) -> ParseChildIterType:
+        """Count the time spent generating lazily rendered objects as render phase."""
+        iterator = iter(objects)
+        while True:
+            with self.phase("render"):
+                try:
+                    data, childs = next(iterator)
+                except StopIteration:
+                    return
+            yield data, self.track(childs)
+
+    def add_rows(self, model: type[Model], count: int = 1):
+        label = model._meta.label_lower
+        self.rows[label] = self.rows.get(label, 0) + count
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "db_time": self.db_time,
+            "wall_time": self.wall_time,
+            "phases": dict(self.phases),
+            "rows": dict(self.rows),
+        }
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from .models import BulkCreationTemplate
+from .jobs import get_job_progress
+from .models import BulkCreationJob, BulkCreationTemplate
 
 
 class TemplateSerializer(serializers.ModelSerializer):
@@ -25,6 +26,36 @@ class TemplateSerializer(serializers.ModelSerializer):
         ]
 
 
+class BulkCreationJobSerializer(serializers.ModelSerializer):
+    """Serializer for the status of a BulkCreationJob."""
+
+    class Meta:
+        """Meta for a serializer."""
+
+        model = BulkCreationJob
+        fields = [
+            "id",
+            "template_type",
+            "status",
+            "generated",
+            "created",
+            "created_pks",
+            "checkpoint",
+            "error",
+            "created_at",
+            "started_at",
+            "heartbeat_at",
+            "finished_at",
+        ]
+
+        read_only_fields = fields
+
+    generated = serializers.SerializerMethodField()
+
+    def get_generated(self, obj):
+        return get_job_progress(obj)
+
+
 class FieldDefinitionSerializer(serializers.Serializer):
     """Serializer for a field definition."""
 
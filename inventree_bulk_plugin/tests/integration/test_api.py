@@ -1,17 +1,21 @@
 import json
+from datetime import timedelta
+from unittest import mock
 
 from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 
 from InvenTree.unit_test import InvenTreeAPITestCase
-from inventree_bulk_plugin.bulkcreate_objects import PartBulkCreateObject
+from inventree_bulk_plugin.bulkcreate_objects import PartBulkCreateObject, StockLocationBulkCreateObject
 from stock.models import StockLocation
 from part.models import Part, PartCategory, PartCategoryParameterTemplate
 from common.models import ParameterTemplate
 from common.models import InvenTreeSetting
 
-from ...models import BulkCreationTemplate
+from ...jobs import STALE_JOB_TIMEOUT, run_job
+from ...models import BulkCreationJob, BulkCreationTemplate
 
 
 @override_settings(
@@ -237,6 +241,61 @@ class InvenTreeBulkPluginAPITestCase(InvenTreeAPITestCase):
         response = self.post(url + f"?parent_id={parent.pk}", data, expected_code=200)
         self.assertJSONEqual(response.content, [[{"name": "Parent 13"}, []]])
 
+        # only a window of the depth first flattened preview is returned with offset/limit/depth
+        response = self.post(url + "?offset=2&limit=3", self.complex_valid_generation_template, expected_code=200)
+        self.assertJSONEqual(response.content, {"total": 25, "offset": 2, "limit": 3, "results": [
+            {"path": [0, 0, 0], "depth": 2, "generated": {"name": "Name", "description": "Description"}},
+            {"path": [0, 1], "depth": 1, "generated": {"name": "CNb", "description": "CDb"}},
+            {"path": [0, 1, 0], "depth": 2, "generated": {"name": "Name", "description": "Description"}},
+        ]})
+
+        response = self.post(url + "?depth=1&limit=1", self.complex_valid_generation_template, expected_code=200)
+        self.assertJSONEqual(response.content, {"total": 5, "offset": 0, "limit": 1, "results": [
+            {"path": [0], "depth": 0, "generated": {"name": "N1", "description": "D1"}},
+        ]})
+
+        # invalid windows are rejected
+        for query, error in [
+            ("depth=0", "'depth' must be an integer >= 1"),
+            ("depth=-1", "'depth' must be an integer >= 1"),
+            ("offset=-1", "'offset' must be an integer >= 0"),
+            ("limit=-1", "'limit' must be an integer >= 0"),
+            ("limit=abc", "'limit' must be an integer >= 0"),
+            ("stream=true&depth=0", "'depth' must be an integer >= 1"),
+        ]:
+            response = self.post(url + f"?{query}", self.complex_valid_generation_template, expected_code=400)
+            self.assertEqual({"error": error}, response.json())
+
+        # count the objects per level without generating them
+        response = self.post(url + "?count=true", self.complex_valid_generation_template, expected_code=200)
+        self.assertJSONEqual(response.content, {"total": 25, "levels": [5, 10, 10]})
+
+        # the flattened preview can be streamed as newline delimited json
+        response = self.post(url + "?stream=true&depth=2", self.complex_valid_generation_template, expected_code=200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(15, len(lines))
+        self.assertEqual({"path": [0], "depth": 0, "generated": {"name": "N1", "description": "D1"}}, json.loads(lines[0]))
+        self.assertEqual({"path": [0, 1], "depth": 1, "generated": {"name": "CNb", "description": "CDb"}}, json.loads(lines[2]))
+
+        # invalid schemas still return an error response
+        data = {
+            "template_type": "STOCK_LOCATION",
+            "template": {"version": "1.0.0", "input": {}, "templates": [], "output": {"generate": {"name": "{{not.existing.context}}"}}},
+        }
+        self.post(url + "?stream=true", data, expected_code=400)
+
+        # errors after the first record are reported as last line
+        data = {
+            "template_type": "STOCK_LOCATION",
+            "template": {"version": "1.0.0", "input": {}, "templates": [], "output": {
+                "dimensions": ["*NUMERIC"], "count": [3], "generate": {"name": "{{dim.1}}{{ 1 / (dim.1|int - 2) }}"}}},
+        }
+        response = self.post(url + "?stream=true", data, expected_code=200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn("error", json.loads(lines[1]))
+
     def test_url_bulkcreate_create(self):
         url = reverse("plugin:inventree-bulk-plugin:api-bulk-create")
 
@@ -292,6 +351,16 @@ class InvenTreeBulkPluginAPITestCase(InvenTreeAPITestCase):
         path_list = list(map(lambda location: location.pathstring, all_objects))
         self.assertListEqual(expected, path_list)
 
+        # with profile, the created pks are returned together with the profile
+        response = self.post(url + f"?parent_id={parent.pk}&create=true&profile=true",
+                             self.complex_valid_generation_template, expected_code=201, max_query_count=1000).json()
+        self.assertEqual(len(response["created"]), 25)
+        profile = response["profile"]
+        self.assertEqual(profile["rows"], {"stock.stocklocation": 25})
+        self.assertGreaterEqual(profile["queries"], 25)
+        self.assertCountEqual(profile["phases"].keys(), ["render", "insert", "relations"])
+        self.assertGreaterEqual(profile["wall_time"], profile["db_time"])
+
         # generation without name should raise an error
         schema = {
             "template_type": "STOCK_LOCATION",
@@ -305,6 +374,137 @@ class InvenTreeBulkPluginAPITestCase(InvenTreeAPITestCase):
         response = self.post(url + f"?parent_id={parent.pk}&create=true", schema, expected_code=400)
         self.assertEqual({"error": "'name' are missing in generated keys."}, response.json())
 
+    def test_url_bulkcreate_create_background(self):
+        url = reverse("plugin:inventree-bulk-plugin:api-bulk-create")
+        parent = StockLocation.objects.create(name="Parent", description="Parent description", parent=None)
+
+        # invalid schemas are rejected before a job is created
+        schema = {**self.complex_valid_generation_template, "template": {"version": "1.0.0"}}
+        self.post(url + f"?parent_id={parent.pk}&create=true&background=true", schema, expected_code=400)
+        self.assertEqual(0, BulkCreationJob.objects.count())
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.post(url + f"?parent_id={parent.pk}&create=true&background=true",
+                                 self.complex_valid_generation_template, expected_code=202).json()
+        self.assertEqual(1, len(callbacks))
+
+        job = BulkCreationJob.objects.get(pk=response["job_id"])
+        self.assertEqual(BulkCreationJob.Status.PENDING, job.status)
+        self.assertEqual({"parent_id": str(parent.pk), "create": "true"}, job.query_params)
+        self.assertEqual(1, StockLocation.objects.count())
+
+        job_url = reverse("plugin:inventree-bulk-plugin:api-detail-jobs", kwargs={"pk": job.pk})
+        self.assertEqual("PENDING", self.get(job_url, expected_code=200).json()["status"])
+
+        # run the job like the background worker does
+        run_job(job.pk)
+        response = self.get(job_url, expected_code=200).json()
+        self.assertEqual("SUCCESS", response["status"])
+        self.assertEqual(25, response["generated"])
+        self.assertEqual(25, response["created"])
+        self.assertEqual("", response["error"])
+        self.assertEqual(26, StockLocation.objects.count())
+
+        created_pks = [pk for start, end in response["created_pks"] for pk in range(start, end + 1)]
+        self.assertCountEqual(created_pks, StockLocation.objects.exclude(pk=parent.pk).values_list("pk", flat=True))
+
+        # errors are stored on the job
+        schema = {
+            "template_type": "STOCK_LOCATION",
+            "template": {
+                "version": "1.0.0",
+                "input": {},
+                "templates": [],
+                "output": {"generate": {"description": "Test description"}}
+            }
+        }
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.post(url + f"?parent_id={parent.pk}&create=true&background=true",
+                                 schema, expected_code=202).json()
+        run_job(response["job_id"])
+        job_url = reverse("plugin:inventree-bulk-plugin:api-detail-jobs", kwargs={"pk": response["job_id"]})
+        response = self.get(job_url, expected_code=200).json()
+        self.assertEqual("FAILURE", response["status"])
+        self.assertEqual("'name' are missing in generated keys.", response["error"])
+
+        # only failed jobs can be resumed
+        resume_url = reverse("plugin:inventree-bulk-plugin:api-resume-jobs", kwargs={"pk": job.pk})
+        response = self.post(resume_url, {}, expected_code=400).json()
+        self.assertEqual("Only failed jobs can be resumed, job is success", response["error"])
+
+        # running jobs are not run twice, and can only be resumed once they did not commit progress for too long
+        stale = timezone.now() - STALE_JOB_TIMEOUT - timedelta(minutes=1)
+        job.status = BulkCreationJob.Status.RUNNING
+        job.started_at = stale
+        job.heartbeat_at = timezone.now()
+        job.save()
+        run_job(job.pk)
+        self.assertEqual(BulkCreationJob.Status.RUNNING, BulkCreationJob.objects.get(pk=job.pk).status)
+        response = self.post(resume_url, {}, expected_code=400).json()
+        self.assertEqual("Only failed jobs can be resumed, job is running", response["error"])
+
+        job.heartbeat_at = stale
+        job.save()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.post(resume_url, {}, expected_code=202).json()
+        self.assertEqual(1, len(callbacks))
+        self.assertEqual("PENDING", response["status"])
+
+        # jobs are only visible for the user who created them
+        job.user = None
+        job.save()
+        self.get(reverse("plugin:inventree-bulk-plugin:api-detail-jobs", kwargs={"pk": job.pk}), expected_code=404)
+        self.post(resume_url, {}, expected_code=404)
+
+    def test_url_bulkcreate_create_background_chunked(self):
+        url = reverse("plugin:inventree-bulk-plugin:api-bulk-create")
+        parent = StockLocation.objects.create(name="Parent", description="Parent description", parent=None)
+
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.post(url + f"?parent_id={parent.pk}&create=true&background=true&chunk_size=2",
+                                 self.complex_valid_generation_template, expected_code=202).json()
+        job_url = reverse("plugin:inventree-bulk-plugin:api-detail-jobs", kwargs={"pk": response["job_id"]})
+        resume_url = reverse("plugin:inventree-bulk-plugin:api-resume-jobs", kwargs={"pk": response["job_id"]})
+
+        # fail in the second chunk, the first chunk stays committed
+        create_objects = StockLocationBulkCreateObject.create_objects
+        calls = []
+
+        def failing_create_objects(self, objects):
+            calls.append(1)
+            if len(calls) == 2:
+                raise ValueError("Test failure")
+            return create_objects(self, objects)
+
+        with mock.patch.object(StockLocationBulkCreateObject, "create_objects", failing_create_objects):
+            run_job(response["job_id"])
+        response = self.get(job_url, expected_code=200).json()
+        self.assertEqual("FAILURE", response["status"])
+        self.assertEqual("Test failure", response["error"])
+        self.assertEqual(2, response["checkpoint"])
+        # committed chunks update the heartbeat
+        self.assertGreater(response["heartbeat_at"], response["started_at"])
+        self.assertEqual(10, response["created"])
+        self.assertEqual(11, StockLocation.objects.count())
+
+        # resume after the checkpoint
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.post(resume_url, {}, expected_code=202).json()
+        self.assertEqual(1, len(callbacks))
+        self.assertEqual("PENDING", response["status"])
+
+        run_job(response["id"])
+        response = self.get(job_url, expected_code=200).json()
+        self.assertEqual("SUCCESS", response["status"])
+        self.assertEqual(5, response["checkpoint"])
+        self.assertEqual(25, response["created"])
+        self.assertEqual(25, response["generated"])
+        self.assertEqual(26, StockLocation.objects.count())
+        self.assertEqual(25, len(set(StockLocation.objects.exclude(pk=parent.pk).values_list("pathstring", flat=True))))
+
+        created_pks = [pk for start, end in response["created_pks"] for pk in range(start, end + 1)]
+        self.assertCountEqual(created_pks, StockLocation.objects.exclude(pk=parent.pk).values_list("pk", flat=True))
+
     def _template_url(self, pk=None):
         if pk:
             return reverse("plugin:inventree-bulk-plugin:api-detail-templates", kwargs={"pk": pk})
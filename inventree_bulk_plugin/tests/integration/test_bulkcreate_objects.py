@@ -1,9 +1,18 @@
 import json
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
 from typing import Type
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_save
 from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
-from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.db.models import Model, IntegerField, DecimalField, FloatField, BooleanField
 from django.contrib.contenttypes.models import ContentType
 from mptt.models import MPTTModel
@@ -14,6 +23,7 @@ from common.models import ParameterTemplate, Parameter
 from stock.models import StockLocation, StockItem
 from common.models import InvenTreeSetting
 
+from ...BulkGenerator.BulkGenerator import BulkGenerator
 from ...bulkcreate_objects import get_model, get_model_instance, cast_model, cast_select, FieldDefinition, BulkCreateObject, StockLocationBulkCreateObject, PartCategoryBulkCreateObject, PartBulkCreateObject
 
 # import modern Attachment model, if it exists otherwise fallback to the legacy attachment system
@@ -79,6 +89,36 @@ class BulkCreateObjectsUtilsTestCase(TestCase):
         with self.assertRaisesRegex(ValueError, "Model 'company.company' where {'name__endswith': 'company'} returned multiple models at XXX"):
             get_model_instance(Company, '{"name__endswith": "company"}', {}, "at XXX")
 
+    def test_get_model_instance_cache(self):
+        supplier_company = Company.objects.create(name="Supplier company", is_supplier=True, is_customer=False)
+        customer_company = Company.objects.create(name="Customer company", is_supplier=False, is_customer=True)
+        obj = PartBulkCreateObject(CustomRequestFactory().get("/abc"))
+
+        with obj.cache_model_instances() as cache:
+            # lookups are only queried once
+            with self.assertNumQueries(1):
+                for _ in range(3):
+                    self.assertEqual(get_model_instance(Company, str(supplier_company.pk), {"is_supplier": True}), supplier_company)
+
+            # not found instances are not cached
+            for _ in range(2):
+                with self.assertNumQueries(1), self.assertRaisesRegex(ValueError, "not found"):
+                    get_model_instance(Company, customer_company.pk, {"is_supplier": True})
+
+            # prefetch all referenced instances with one query per model and limit_choices
+            cache.instances.clear()
+            with self.assertNumQueries(2):
+                obj.prefetch_model_instances([
+                    ({"name": "A", "supplier": {"supplier": str(supplier_company.pk)}}, []),
+                    ({"name": "B", "manufacturer": {"manufacturer": "999999"}}, []),
+                ])
+            with self.assertNumQueries(0):
+                self.assertEqual(get_model_instance(Company, str(supplier_company.pk), {"is_supplier": True}), supplier_company)
+
+        # outside of the context, the cache is not used
+        with self.assertNumQueries(1):
+            get_model_instance(Company, supplier_company.pk, {"is_supplier": True})
+
     def test_cast_model(self):
         # shouldn't change anything if field is no model field or uses custom processor
         self.assertEqual(cast_model("10", field=FieldDefinition("A")), "10")
@@ -106,6 +146,15 @@ class BulkCreateObjectsUtilsTestCase(TestCase):
         self.assertEqual(cast_select("b", field=FieldDefinition(
             "A", field_type="select", get_options=lambda: options)), "b")
 
+        # get_options is only called once per field definition
+        get_options_calls = []
+        field = FieldDefinition("A", field_type="select", get_options=lambda: get_options_calls.append(1) or options)
+        for value in ["a", "b", "a"]:
+            self.assertEqual(cast_select(value, field=field), value)
+        with self.assertRaisesRegex(ValueError, "'c' is not a valid option, choose one of: a, b."):
+            cast_select("c", field=field)
+        self.assertEqual(len(get_options_calls), 1)
+
 
 class FieldDefinitionTestCase(TestCase):
     def test_auto_typecasts(self):
@@ -253,6 +302,27 @@ class BulkCreateObjectTestCase(TestCase):
         path_list = list(map(lambda category: category.pathstring, all_categories))
         self.assertListEqual(expected, path_list)
 
+    def test_create_objects_tree_bulk_insert(self):
+        root = StockLocation.objects.create(name="Root")
+        parent_location = StockLocation.objects.create(name="Parent", parent=root)
+        my_obj = StockLocationBulkCreateObject(self.request.get(f"/abc?parent_id={parent_location.pk}&bulk_insert=true"))
+        my_obj.get_context()  # used to init
+        created_locations = my_obj.create_objects(
+            [({"name": "A"}, [({"name": "1"}, []), ({"name": "2"}, [({"name": "1", "structural": True}, [])])]), ({"name": "B"}, [])])
+
+        # created objects are returned in depth first order
+        expected = ["Root/Parent/A", "Root/Parent/A/1", "Root/Parent/A/2", "Root/Parent/A/2/1", "Root/Parent/B"]
+        self.assertListEqual(expected, [location.pathstring for location in created_locations])
+        self.assertTrue(all(location.pk for location in created_locations))
+        self.assertTrue(created_locations[3].structural)
+
+        # the mptt tree has been rebuilt
+        parent_location.refresh_from_db()
+        self.assertEqual(parent_location.get_descendant_count(), 5)
+        self.assertListEqual(expected, [location.pathstring for location in parent_location.get_descendants()])
+        self.assertListEqual(["Root", "Parent", "A", "2", "1"], [
+                             location.name for location in StockLocation.objects.get(pk=created_locations[3].pk).get_ancestors(include_self=True)])
+
     def test_get_context_tree(self):
         class MyBulkCreateObject(BulkCreateObject):
             name = "part category"
@@ -490,6 +560,14 @@ class PartBulkCreateObjectTestCase(BulkCreateObjectTestMixin, TestCase):
             c = len(model.objects.all())
             self.assertEqual(c, count, f"There should be only {count} of {model}, found {c}")
 
+        # relations are created after the part, but still linked to each other
+        supplier_part = SupplierPart.objects.get()
+        self.assertEqual(supplier_part.manufacturer_part, ManufacturerPart.objects.get(part=part))
+        self.assertTrue(supplier_part.primary)
+        stock_item = StockItem.objects.get()
+        self.assertEqual(stock_item.supplier_part, supplier_part)
+        self.assertEqual(stock_item.tracking_info.count(), 1)
+
         # --- start: Test all exceptions here
 
         # try attachment and link for the same attachment
@@ -548,6 +626,20 @@ class PartBulkCreateObjectTestCase(BulkCreateObjectTestMixin, TestCase):
                 }, [])
             ])
 
+        # local images must be media files, cached downloads are evicted by the cache
+        cache_dir = Path(tempfile.mkdtemp(dir=settings.MEDIA_ROOT))
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cached_image = cache_dir / "blob.png"
+        cached_image.write_bytes(b"cached")
+        for image in ["../outside.png", str(cached_image.relative_to(settings.MEDIA_ROOT))]:
+            with self.subTest(image=image), mock.patch.object(PartBulkCreateObject, "get_download_cache_dir", return_value=cache_dir):
+                with self.assertRaisesRegex(ValueError, f"Image '{re.escape(image)}' for part 'Test image' is not a media file"):
+                    req = self.request.get(f"/abc?parent_id={category.pk}")
+                    req.user = self.user
+                    obj = PartBulkCreateObject(req)
+                    obj.get_context()
+                    obj.create_objects([({"name": "Test image", "description": "Test Description", "image": image}, [])])
+
         # try with non template part as parent
         with self.assertRaisesRegex(ValueError, "Part 'Test 1_8_1' cannot be a variant of 'Test 1_8' because the parent is not a template part."):
             req = self.request.get(f"/abc?parent_id={category.pk}")
@@ -684,6 +776,208 @@ class PartBulkCreateObjectTestCase(BulkCreateObjectTestMixin, TestCase):
         self.assertEqual(created.IPN, None)
         InvenTreeSetting.set_setting("PART_ALLOW_DUPLICATE_IPN", True, None)
 
+    def test_create_objects_parameters(self):
+        category = PartCategory.objects.create(name="Test category")
+        template1 = ParameterTemplate.objects.create(model_type=self.part_content_type, name="Test 1", units="kg")
+        template2 = ParameterTemplate.objects.create(model_type=self.part_content_type, name="Test 2", units="kg")
+
+        saved = []
+
+        def on_save(sender, **kwargs):
+            saved.append(sender)
+
+        post_save.connect(on_save, sender=Parameter)
+        self.addCleanup(post_save.disconnect, on_save, sender=Parameter)
+
+        # by default each parameter is saved, with bulk_insert=true post_save is not sent
+        for bulk_insert, expected_signals in [("false", 9), ("true", 0)]:
+            with self.subTest(bulk_insert=bulk_insert):
+                Parameter.objects.all().delete()
+                saved.clear()
+
+                req = self.request.get(f"/abc?parent_id={category.pk}&bulk_insert={bulk_insert}")
+                req.user = self.user
+                obj = PartBulkCreateObject(req)
+                obj.get_context()
+                created = obj.create_objects([
+                    ({"name": f"Test {bulk_insert} {i}", "description": "Test", "is_template": True,
+                      "parameters": [{"template": str(template1.pk), "value": str(i)}]}, [
+                        ({"name": f"Test {bulk_insert} {i}_1", "description": "Test",
+                          "parameters": [{"template": str(template2.pk), "value": "13"}]}, []),
+                    ])
+                    for i in range(3)
+                ])
+                self.assertEqual(len(created), 6)
+                self.assertEqual(len(saved), expected_signals)
+
+                # templates are only resolved once and parameters of parents created in the same run are inherited
+                self.assertEqual(len(obj.parameter_templates), 2)
+                self.assertEqual(Parameter.objects.count(), 9)
+                self.assertCountEqual([(p.template.name, p.data) for p in created[1].get_parameters()], [
+                    ("Test 1", "0"), ("Test 2", "13")])
+
+                # the numeric value is calculated in both cases
+                self.assertAlmostEqual(created[2].get_parameters().get().data_numeric, 1)
+
+    def test_create_objects_company_parts(self):
+        category = PartCategory.objects.create(name="Test category")
+        supplier_company = Company.objects.create(name="Supplier", is_supplier=True)
+        manufacturer_company = Company.objects.create(name="Manufacturer", is_manufacturer=True)
+
+        saved = []
+
+        def on_save(sender, **kwargs):
+            saved.append(sender)
+
+        for model in [ManufacturerPart, SupplierPart]:
+            post_save.connect(on_save, sender=model)
+            self.addCleanup(post_save.disconnect, on_save, sender=model)
+
+        def create(bulk_insert, name, pack_quantity="1"):
+            req = self.request.get(f"/abc?parent_id={category.pk}&bulk_insert={bulk_insert}")
+            req.user = self.user
+            obj = PartBulkCreateObject(req)
+            obj.get_context()
+            return obj.create_objects([({
+                "name": name,
+                "description": "Test",
+                "manufacturer": {"manufacturer": str(manufacturer_company.pk), "MPN": f"MPN-{name}"},
+                "supplier": {"supplier": str(supplier_company.pk), "SKU": f"SKU-{name}",
+                             "pack_quantity": pack_quantity, "_make_default": True},
+            }, [])])
+
+        # by default each object is saved, with bulk_insert=true post_save is not sent
+        for bulk_insert, expected_signals in [("false", 2), ("true", 0)]:
+            with self.subTest(bulk_insert=bulk_insert):
+                saved.clear()
+                part, = create(bulk_insert, f"Test {bulk_insert}")
+                self.assertEqual(len(saved), expected_signals)
+
+                supplier_part = SupplierPart.objects.get(part=part)
+                self.assertEqual(supplier_part.manufacturer_part, ManufacturerPart.objects.get(part=part))
+                self.assertTrue(supplier_part.primary)
+
+        # the pack quantity of supplier parts is still validated with bulk inserts
+        with self.assertRaises(ValidationError):
+            create("true", "Test invalid", pack_quantity="not a quantity")
+        self.assertFalse(Part.objects.filter(name="Test invalid").exists())
+
+    def test_create_objects_variant_parent_snapshot(self):
+        category = PartCategory.objects.create(name="Test category")
+        template = ParameterTemplate.objects.create(model_type=self.part_content_type, name="Test 1", units="kg")
+        template_part = Part.objects.create(name="Template", description="Template description", is_template=True)
+        Parameter.objects.create(model_type=self.part_content_type, model_id=template_part.pk, template=template, data="10")
+
+        req = self.request.get(f"/abc?parent_id={category.pk}")
+        req.user = self.user
+        req.data = {"template": {"output": {"generate": {"variant_of": str(template_part.pk)}}}}
+        obj = PartBulkCreateObject(req)
+        obj.get_context()
+        created = obj.create_objects([({"name": f"Variant {i}"}, []) for i in range(5)])
+
+        # the parent is only read once for all variants
+        self.assertEqual(list(obj.parent_snapshots.keys()), [template_part.pk])
+        for part in created:
+            self.assertEqual(part.description, "Template description")
+            self.assertEqual([(p.template, p.data) for p in part.get_parameters()], [(template, "10")])
+
+    def test_create_objects_lazy_variants(self):
+        category = PartCategory.objects.create(name="Test category")
+        supplier_company = Company.objects.create(name="Supplier", is_supplier=True)
+        template = ParameterTemplate.objects.create(model_type=self.part_content_type, name="Test 1", units="kg")
+
+        req = self.request.get(f"/abc?parent_id={category.pk}")
+        req.user = self.user
+        obj = PartBulkCreateObject(req)
+        ctx = obj.get_context()
+        bulk_generator = BulkGenerator({
+            "version": "1.0.0",
+            "input": {},
+            "templates": [],
+            "output": {
+                "generate": {
+                    "name": "Template",
+                    "description": "desc-A",
+                    "is_template": "true",
+                    "supplier": {"supplier": str(supplier_company.pk), "SKU": "SKU-A"},
+                    "parameters": [{"template": str(template.pk), "value": "42"}],
+                },
+                "child": {
+                    "generate": {
+                        "name": "{{par.gen.supplier.SKU}}-V",
+                        "description": "{{par.gen.description}}|{{par.gen.parameters}}",
+                    },
+                },
+            },
+        }, fields=obj.fields)
+
+        # childs are rendered after their parent is created, the parent values must not be changed by creating it
+        preview = bulk_generator.preview(ctx)["results"][1]["generated"]
+        with obj.cache_model_instances():
+            created = obj.create_objects(bulk_generator.iter_generate(ctx))
+
+        self.assertEqual(len(created), 2)
+        variant = created[1]
+        self.assertEqual(variant.variant_of, created[0])
+        self.assertEqual(variant.name, "SKU-A-V")
+        self.assertEqual(variant.name, preview["name"])
+        self.assertEqual(variant.description, preview["description"])
+        self.assertTrue(variant.description.startswith("desc-A|[{"))
+        self.assertIn("'value': '42'", variant.description)
+
+    def test_create_objects_related_parts(self):
+        category = PartCategory.objects.create(name="Test category")
+        existing = Part.objects.create(name="Existing", description="Test", category=category)
+        other = Part.objects.create(name="Other", description="Test", category=category)
+        PartRelated.objects.create(part_1=other, part_2=existing)
+
+        saved = []
+
+        def on_save(sender, **kwargs):
+            saved.append(sender)
+
+        post_save.connect(on_save, sender=PartRelated)
+        self.addCleanup(post_save.disconnect, on_save, sender=PartRelated)
+
+        # by default each relation is saved, with bulk_insert=true post_save is not sent
+        for bulk_insert, expected_signals in [("false", 5), ("true", 0)]:
+            with self.subTest(bulk_insert=bulk_insert):
+                Part.objects.filter(name__startswith="R").delete()
+                saved.clear()
+
+                req = self.request.get(f"/abc?parent_id={category.pk}&bulk_insert={bulk_insert}")
+                req.user = self.user
+                obj = PartBulkCreateObject(req)
+                obj.get_context()
+                created = obj.create_objects([
+                    ({"name": "R1", "description": "Test", "related_parts": [json.dumps({"category": category.pk}), str(existing.pk)]}, []),
+                    ({"name": "R2", "description": "Test", "related_parts": [json.dumps({"category": category.pk})]}, []),
+                ])
+                self.assertEqual(len(saved), expected_signals)
+
+                # filters are evaluated once after all parts are created, relations are created once in any direction
+                self.assertEqual(len(obj.related_part_queries), 2)
+                self.assertEqual(created[0].get_related_parts(), {existing, other, created[1]})
+                self.assertEqual(created[1].get_related_parts(), {existing, other, created[0]})
+                self.assertEqual(PartRelated.objects.count(), 6)
+
+    def test_create_objects_settings_snapshot(self):
+        category = PartCategory.objects.create(name="Test category")
+
+        def count_queries(n):
+            req = self.request.get(f"/abc?parent_id={category.pk}")
+            req.user = self.user
+            obj = PartBulkCreateObject(req)
+            obj.get_context()
+            with CaptureQueriesContext(connection) as ctx:
+                obj.create_objects([({"name": f"Test {n}_{i}", "description": "Test"}, []) for i in range(n)])
+            return len([q for q in ctx.captured_queries if "setting" in q["sql"].lower()])
+
+        count_queries(1)  # warm up the settings cache
+
+        # settings are read once per bulk creation, not once per part
+        self.assertEqual(count_queries(1), count_queries(20))
+
     def test_get_context(self):
         # test without category id
         obj = PartBulkCreateObject(self.request.get("/abc"))
@@ -0,0 +1,225 @@
+import io
+import json
+import stat
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+import requests
+from django.core.files import File
+from PIL import Image
+
+from ...downloads import DownloadCache, Downloader, close_file
+
+
+class DownloadRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.requests.append(self.path)
+
+        try:
+            time.sleep(0.05)
+            if self.path.startswith("/file/"):
+                content = self.path.encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+            elif self.path in ["/image.png", "/image.bmp"]:
+                buffer = io.BytesIO()
+                Image.new("RGB", (4, 4), "red").save(buffer, format=self.path.split(".")[-1].upper())
+                server.image = buffer.getvalue()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(buffer.getvalue())))
+                self.end_headers()
+                self.wfile.write(buffer.getvalue())
+            elif self.path.startswith("/etag/"):
+                if self.headers.get("If-None-Match", None) == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                content = b"same content"
+                self.send_response(200)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+            elif self.path == "/headers":
+                content = self.headers.get("X-Test", "").encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+            else:
+                self.send_error(404)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DownloaderTestCase(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), DownloadRequestHandler)
+        self.server.lock = threading.Lock()
+        self.server.active = 0
+        self.server.max_active = 0
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_download_all(self):
+        urls = [f"{self.url}/file/{i}" for i in range(10)]
+
+        with Downloader(max_workers=8, max_per_host=3) as downloader:
+            res = downloader.download_all([*urls, urls[0]], lambda d, url: d.download_file(url))
+
+        self.assertListEqual(urls, list(res.keys()))
+        self.assertListEqual([f"/file/{i}".encode() for i in range(10)], [f.read() for f in res.values()])
+
+        # duplicate urls are only downloaded once and the per host limit is respected
+        self.assertEqual(10, len(self.server.requests))
+        self.assertLessEqual(self.server.max_active, 3)
+        self.assertGreater(self.server.max_active, 1)
+
+    def test_download_headers(self):
+        with Downloader() as downloader:
+            self.assertEqual(b"abc", downloader.download_file(f"{self.url}/headers", headers={"X-Test": "abc"}).read())
+
+    def test_download_spool(self):
+        # files larger than the threshold are written to disk
+        with Downloader(spool_threshold=4) as downloader:
+            small = downloader.download_file(f"{self.url}/headers", headers={"X-Test": "abc"})
+            large = downloader.download_file(f"{self.url}/file/1234")
+        self.assertFalse(small._rolled)
+        self.assertTrue(large._rolled)
+        self.assertEqual(b"/file/1234", large.read())
+
+        close_file(File(large))
+        self.assertTrue(large.closed)
+
+        # the total size of all downloads is limited
+        with Downloader(max_total_size=10) as downloader:
+            downloader.download_file(f"{self.url}/file/1")
+            with self.assertRaisesRegex(ValueError, "Total download size exceeded maximum size"):
+                downloader.download_file(f"{self.url}/file/2")
+
+    def test_download_errors(self):
+        urls = [f"{self.url}/file/1", f"{self.url}/missing/1", f"{self.url}/file/2", f"{self.url}/missing/2"]
+
+        # all errors are reported in the order of the urls
+        with Downloader(max_workers=4) as downloader:
+            with self.assertRaises(ValueError) as cm:
+                downloader.download_all(urls, lambda d, url: d.download_file(url))
+
+        lines = str(cm.exception).splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[0].startswith(f"{self.url}/missing/1: 404"))
+        self.assertTrue(lines[1].startswith(f"{self.url}/missing/2: 404"))
+
+    def test_download_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = DownloadCache(cache_dir, 1024)
+            urls = [f"{self.url}/etag/1", f"{self.url}/etag/2", f"{self.url}/file/1"]
+
+            with Downloader(cache=cache, max_total_size=100) as downloader:
+                res = downloader.download_all(urls, lambda d, url: d.download_file(url))
+                self.assertListEqual([b"same content", b"same content", b"/file/1"], [f.read() for f in res.values()])
+                self.assertEqual(31, downloader.total_size)
+
+            # only files with a validator are cached, identical files are stored once
+            self.assertEqual(2, len(list(cache.index_path.iterdir())))
+            self.assertEqual(1, len(list(cache.blobs_path.iterdir())))
+
+            # the cache directories are only accessible by the owner
+            for path in (cache.index_path, cache.blobs_path):
+                self.assertEqual(0o700, stat.S_IMODE(path.stat().st_mode))
+
+            # cached files are revalidated, and not downloaded again, but count towards the limits
+            self.server.requests.clear()
+            with Downloader(cache=cache, max_total_size=100) as downloader:
+                res = downloader.download_all(urls, lambda d, url: d.download_file(url))
+                self.assertListEqual([b"same content", b"same content", b"/file/1"], [f.read() for f in res.values()])
+                self.assertEqual(31, downloader.total_size)
+                self.assertEqual(3, len(self.server.requests))
+                for f in res.values():
+                    f.close()
+
+            with Downloader(cache=cache) as downloader:
+                with self.assertRaisesRegex(ValueError, "File size is too large"):
+                    downloader.download_file(urls[0], max_size=5)
+
+            with Downloader(cache=cache, max_total_size=20) as downloader:
+                with self.assertRaisesRegex(ValueError, "Total download size exceeded maximum size"):
+                    downloader.download_all(urls[:2], lambda d, url: d.download_file(url))
+
+            # blobs which do not match their hash are dropped and downloaded again
+            blob_file = next(cache.blobs_path.iterdir())
+            blob_file.write_bytes(b"tampered")
+            self.server.requests.clear()
+            with Downloader(cache=cache) as downloader:
+                with downloader.download_file(urls[0]) as f:
+                    self.assertEqual(b"same content", f.read())
+            self.assertEqual(["/etag/1", "/etag/1"], self.server.requests)
+            self.assertEqual(b"same content", blob_file.read_bytes())
+
+            # index entries must point to a blob in the cache
+            index_file = cache.get_index_file(urls[1], {})
+            index_file.write_text(json.dumps({"url": urls[1], "blob": "../index/" + index_file.name}))
+            self.assertIsNone(cache.lookup(urls[1], {}))
+            self.assertFalse(index_file.exists())
+
+            # the headers are part of the cache key
+            self.assertIsNone(cache.lookup(urls[0], {"X-Test": "abc"}))
+            self.assertIsNotNone(cache.lookup(urls[0], {}))
+
+            # blobs are evicted if the cache is too large, and their index entries are removed on lookup
+            cache.max_size = 5
+            cache.prune()
+            self.assertEqual(0, len(list(cache.blobs_path.iterdir())))
+            self.assertIsNone(cache.lookup(urls[0], {}))
+            self.assertEqual(0, len(list(cache.index_path.iterdir())))
+
+    def test_download_image(self):
+        with Downloader() as downloader:
+            # the original bytes are kept
+            img = downloader.download_image(f"{self.url}/image.png", 1024 * 1024)
+            self.assertEqual("PNG", img.format)
+            self.assertEqual(self.server.image, img.content)
+
+            # other formats are converted to png
+            img = downloader.download_image(f"{self.url}/image.bmp", 1024 * 1024)
+            self.assertEqual("PNG", img.format)
+            with Image.open(io.BytesIO(img.content)) as converted:
+                self.assertEqual("PNG", converted.format)
+                self.assertEqual((4, 4), converted.size)
+
+            with self.assertRaisesRegex(ValueError, "File size is too large"):
+                downloader.download_image(f"{self.url}/image.png", 10)
+
+            with self.assertRaisesRegex(TypeError, "Supplied URL is not a valid image file"):
+                downloader.download_image(f"{self.url}/file/1", 1024 * 1024)
+
+            # urls are validated before they are requested
+            self.server.requests.clear()
+            for url in ["file:///etc/passwd", "not a url", "http://"]:
+                with self.subTest(url), self.assertRaisesRegex(ValueError, "Invalid image url"):
+                    downloader.download_image(url, 1024 * 1024)
+            self.assertListEqual([], self.server.requests)
+
+        # images are downloaded with the image timeout
+        with Downloader(image_timeout=0.01) as downloader:
+            with self.assertRaises(requests.exceptions.Timeout):
+                downloader.download_image(f"{self.url}/image.png", 1024 * 1024)
@@ -1,6 +1,7 @@
+import json
 import unittest
 
-from ...BulkGenerator.BulkGenerator import BulkGenerator, BaseFieldDefinition, apply_template
+from ...BulkGenerator.BulkGenerator import BulkGenerator, BaseFieldDefinition, apply_template, compile_parent_name_match
 from ...BulkGenerator.validations import BulkDefinitionChild, BulkDefinitionChildTemplate
 
 
@@ -32,6 +33,145 @@ class BulkGeneratorTestCase(unittest.TestCase):
                     self.assertDictEqual({"name": f"before{e}after"}, r)
                     self.assertEqual(len(child), 0, "should generate no child's")
 
+    def setUp(self):
+        self.rendered = []
+
+        def cast_func(x, **kwargs):
+            self.rendered.append(x)
+            return x
+
+        self.fields = {"name": BaseFieldDefinition("Name", cast_func=cast_func)}
+
+    def make_generator(self, **output):
+        """Generator for three numeric parents with two alpha childs each, rendered names are logged to self.rendered."""
+        return BulkGenerator({
+            "version": "1.0.0",
+            "input": {},
+            "templates": [],
+            "output": {
+                "dimensions": ["*NUMERIC"],
+                "count": [3],
+                "generate": {"name": "{{dim.1}}"},
+                "child": {
+                    "dimensions": ["*ALPHA"],
+                    "count": [2],
+                    "generate": {"name": "{{par.gen.name}}{{dim.1}}"},
+                },
+                **output,
+            }
+        }, fields=self.fields)
+
+    def test_iter_generate(self):
+        res = self.make_generator().iter_generate()
+
+        # nothing should be rendered until the first item is consumed
+        self.assertListEqual([], self.rendered)
+        generated, childs = next(res)
+        self.assertDictEqual({"name": "1"}, generated)
+        self.assertListEqual(["1"], self.rendered)
+
+        self.assertListEqual([({"name": "1a"}, []), ({"name": "1b"}, [])], [(g, list(c)) for g, c in childs])
+        self.assertListEqual(["1", "1a", "1b"], self.rendered)
+
+        # the remaining items are generated in depth first order
+        self.assertListEqual(["2", "3"], [g["name"] for g, _ in res])
+
+        # generate should materialize the same tree
+        self.assertEqual(
+            [(g, [(cg, list(cc)) for cg, cc in c]) for g, c in self.make_generator().iter_generate()],
+            self.make_generator().generate(),
+        )
+
+    def test_preview(self):
+        # only the window is rendered, parents are rendered if their childs depend on them
+        res = self.make_generator().preview(offset=5, limit=2)
+        self.assertDictEqual({"total": 9, "offset": 5, "limit": 2, "results": [
+            {"path": [1, 1], "depth": 1, "generated": {"name": "2b"}},
+            {"path": [2], "depth": 0, "generated": {"name": "3"}},
+        ]}, res)
+        self.assertListEqual(["2", "2b", "3"], self.rendered)
+
+        # depth limits the levels
+        self.rendered.clear()
+        res = self.make_generator().preview(limit=2, max_depth=1)
+        self.assertEqual(3, res["total"])
+        self.assertListEqual([[0], [1]], [r["path"] for r in res["results"]])
+        self.assertListEqual(["1", "2"], self.rendered)
+
+        # without window, everything is returned in depth first order
+        res = self.make_generator().preview()
+        self.assertListEqual(["1", "1a", "1b", "2", "2a", "2b", "3", "3a", "3b"], [r["generated"]["name"] for r in res["results"]])
+
+        # parent name matches which depend on the generated values render the parent
+        self.rendered.clear()
+        res = self.make_generator(child=None, childs=[{
+            "parent_name_match": "{{par.gen.name == '2'}}",
+            "dimensions": ["*ALPHA"],
+            "count": [2],
+            "generate": {"name": "{{dim.1}}"},
+        }, {
+            "parent_name_match": "true",
+            "generate": {"name": "x"},
+        }]).preview(limit=0)
+        self.assertDictEqual({"total": 7, "offset": 0, "limit": 0, "results": []}, res)
+        self.assertListEqual(["1", "2", "3"], self.rendered)
+
+    def test_preview_matches_generate(self):
+        generator = self.make_generator(count=[2], child={"generate": {"name": "{{par.gen|to_json}}"}})
+
+        expected = []
+        for g, childs in generator.generate():
+            expected.append(g)
+            expected.extend(cg for cg, _ in childs)
+
+        res = generator.preview()
+        self.assertListEqual(expected, [r["generated"] for r in res["results"]])
+        self.assertEqual('{"name": "1"}', res["results"][1]["generated"]["name"])
+
+        # invalid windows are rejected
+        for kwargs in [{"max_depth": 0}, {"max_depth": -1}, {"offset": -1}, {"limit": -1}]:
+            with self.subTest(kwargs), self.assertRaises(ValueError):
+                generator.preview(**kwargs)
+
+    def test_count(self):
+        childs = [{
+            "parent_name_match": "false",
+            "generate": {"name": "never"},
+        }, {
+            "parent_name_match": "true",
+            "dimensions": ["*NUMERIC"],
+            "count": [4],
+            "generate": {"name": "{{par.gen.name}}-{{dim.1}}"},
+            "child": {"generate": {"name": "leaf"}},
+        }]
+
+        def make_generator():
+            return self.make_generator(
+                dimensions=["*NUMERIC", "*ALPHA"],
+                count=[3, 2],
+                generate={"name": "{{dim.1}}{{dim.2}}"},
+                child=None,
+                childs=childs,
+            )
+
+        # constant parent name matches are counted without rendering
+        self.assertDictEqual({"total": 54, "levels": [6, 24, 24]}, make_generator().count())
+        self.assertListEqual([], self.rendered)
+
+        # dynamic parent name matches only render the parents
+        childs[0]["parent_name_match"] = "{{par.dim.1 == '1'}}"
+        self.assertDictEqual({"total": 40, "levels": [6, 18, 16]}, make_generator().count())
+        self.assertListEqual([], self.rendered)
+
+        childs[0]["parent_name_match"] = "{{par.gen.name == '1a'}}"
+        self.assertDictEqual({"total": 47, "levels": [6, 21, 20]}, make_generator().count())
+        self.assertListEqual(["1a", "1b", "2a", "2b", "3a", "3b"], self.rendered)
+
+        # the counts match the generated output
+        res = make_generator().preview()
+        self.assertEqual(47, res["total"])
+        self.assertEqual(47, len(res["results"]))
+
     def test_template(self):
         res = BulkGenerator({
             "version": "1.0.0",
@@ -265,6 +405,27 @@ class BulkGeneratorTestCase(unittest.TestCase):
         for i, (e, childs) in enumerate(res):
             self.assertEqual("first" if i + 1 <= 4 else "second", childs[0][0]["a"])
 
+    def test_compile_parent_name_match(self):
+        cases = [
+            ("true", {}, True),
+            ("Off", {}, False),
+            ("{{a > 2}}", {"a": 3}, True),
+            ("{{a > 2}}", {"a": 1}, False),
+            ("{{a}}", {"a": "YES"}, True),
+            ("{{a}}", {"a": "no"}, False),
+            ("{{not_defined}}", {}, False),
+            ("{{- a -}}", {"a": "on"}, True),
+            ("{% if a %}true{% endif %}", {"a": True}, True),
+            ("{{a}} and {{a}}", {"a": "true"}, False),
+        ]
+
+        for template, ctx, expected in cases:
+            with self.subTest(template, ctx=ctx):
+                self.assertEqual(expected, compile_parent_name_match(template)(ctx))
+
+        with self.assertRaisesRegex(ValueError, "Invalid generator template '{{}'"):
+            compile_parent_name_match("{{}")
+
     def test_missing_child_match(self):
         with self.assertRaisesRegex(ValueError, "No match for 1"):
             BulkGenerator({
@@ -327,6 +488,32 @@ class BulkGeneratorTestCase(unittest.TestCase):
         self.assertListEqual([({'name': 'First A'}, [({'name': 'Second '}, [({'parent_name': 'Second ', 'parent_parent_dim_1': 'A'}, [])])]), ({
                              'name': 'First B'}, [({'name': 'Second '}, [({'parent_name': 'Second ', 'parent_parent_dim_1': 'B'}, [])])])], res)
 
+    def test_parent_context_to_json(self):
+        res = BulkGenerator({
+            "version": "1.0.0",
+            "input": {},
+            "templates": [],
+            "output": {
+                "dimensions": ["A-B"],
+                "generate": {"name": "First {{dim.1}}"},
+                "child": {
+                    "generate": {"name": "Second"},
+                    "child": {
+                        "generate": {"par": "{{par|to_json}}", "par_par": "{{par.par|to_json}}"}
+                    }
+                }
+            }
+        }, fields={
+            "name": BaseFieldDefinition("Name"),
+            "par": BaseFieldDefinition("par"),
+            "par_par": BaseFieldDefinition("par_par"),
+        }).generate()
+
+        data = res[0][1][0][1][0][0]
+        self.assertEqual({"par": {"par": {}, "len": 2, "dim": {"1": "A"}, "gen": {"name": "First A"}},
+                         "len": 1, "dim": {}, "gen": {"name": "Second"}}, json.loads(data["par"]))
+        self.assertEqual({"par": {}, "len": 2, "dim": {"1": "A"}, "gen": {"name": "First A"}}, json.loads(data["par_par"]))
+
     def test_len_context_variable(self):
         res = BulkGenerator({
             "version": "1.0.0",
@@ -0,0 +1,44 @@
+import unittest
+
+from ...BulkGenerator.cache import LRUCache
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_get_or_set(self):
+        cache = LRUCache(maxsize=2)
+        calls = []
+
+        def factory(value):
+            def inner():
+                calls.append(value)
+                return value
+            return inner
+
+        self.assertEqual("a", cache.get_or_set("a", factory("a")))
+        self.assertEqual("a", cache.get_or_set("a", factory("x")))
+        self.assertListEqual(["a"], calls)
+
+        info = cache.cache_info()
+        self.assertEqual((1, 1, 0, 2, 1), (info.hits, info.misses, info.evictions, info.maxsize, info.currsize))
+
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.get_or_set("a", lambda: 1)
+        cache.get_or_set("b", lambda: 2)
+
+        # touch a, so that b is the least recently used entry
+        cache.get_or_set("a", lambda: 1)
+        cache.get_or_set("c", lambda: 3)
+
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.cache_info().evictions)
+        self.assertEqual(1, cache.get_or_set("a", lambda: None))
+        self.assertEqual(None, cache.get_or_set("b", lambda: None))
+
+    def test_cache_clear(self):
+        cache = LRUCache(maxsize=2)
+        cache.get_or_set("a", lambda: 1)
+        cache.get_or_set("a", lambda: 1)
+        cache.cache_clear()
+
+        self.assertEqual((0, 0, 0, 2, 0), tuple(cache.cache_info()))
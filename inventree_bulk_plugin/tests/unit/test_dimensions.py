@@ -1,7 +1,7 @@
 import unittest
 
 from ...BulkGenerator.generators.generator import GeneratorTypes, Generator
-from ...BulkGenerator.dimensions import parse_dimension, match_generator, get_dimension_values
+from ...BulkGenerator.dimensions import parse_dimension, match_generator, get_dimension_values, get_dimension_cache_info, dimension_cache, generator_cache
 
 
 class DimensionsTestCase(unittest.TestCase):
@@ -41,6 +41,21 @@ class DimensionsTestCase(unittest.TestCase):
                     self.assertDictEqual(exp_settings, settings)
                     self.assertEqual(exp_gen_str, gen_str)
 
+    def test_parse_dimension_cache(self):
+        dimension_cache.cache_clear()
+
+        parsed = parse_dimension("1-3,*NUMERIC(count=2)")
+        self.assertIs(parsed, parse_dimension("1-3,*NUMERIC(count=2)"))
+
+        info = get_dimension_cache_info()["parse_dimension"]
+        self.assertEqual((1, 1), (info.hits, info.misses))
+
+        # parsed dimensions are shared, so they must not be modified
+        with self.assertRaises(TypeError):
+            parsed[1].settings["count"] = "3"
+        with self.assertRaises(TypeError):
+            parsed[1].settings.update({"count": "3"})
+
     def test_match_generator(self):
         class AGenerator(Generator):
             NAME = "A_GENERATOR"
@@ -69,6 +84,14 @@ class DimensionsTestCase(unittest.TestCase):
                 res = match_generator(generators, gen_type, gen)
                 self.assertEqual(expected, res)
 
+        # lookups should be served from the cache
+        generator_cache.cache_clear()
+        for _ in range(2):
+            self.assertEqual(CGenerator, match_generator(generators, GeneratorTypes.RANGE, ("A", "B")))
+            self.assertEqual(AGenerator, match_generator(generators, GeneratorTypes.INFINITY, "A_GENERATOR"))
+        info = get_dimension_cache_info()["match_generator"]
+        self.assertEqual((2, 2), (info.hits, info.misses))
+
     def test_get_dimension_values(self):
         cases = [
             ("abc", None, ["abc"]),
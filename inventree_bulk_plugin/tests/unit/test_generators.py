@@ -26,6 +26,33 @@ class NumericGeneratorTestCase(unittest.TestCase):
         gen = NumericGenerator(GeneratorTypes.RANGE, ("1", "42"), {}, "1-42")
         self.assertListEqual(list(map(str, range(1, 42))), list(islice(gen.generator(), 1, 42)))
 
+    def test_unrank(self):
+        gen = NumericGenerator(GeneratorTypes.RANGE, ("1", "42"), {}, "1-42")
+        self.assertEqual("42", gen.unrank(gen.get_index("42")))
+
+    def test_get_values(self):
+        gen = NumericGenerator(GeneratorTypes.INFINITY, "NUMERIC", {}, "*NUMERIC")
+        self.assertListEqual(["1000000", "1000002"], gen.get_values(1000000, 1000004, 2))
+        self.assertListEqual(["1000000", "1000001"], get_dimension_values("*NUMERIC(start=1000000,count=2)", None))
+
+    def test_width(self):
+        cases = [
+            # values are only padded if a width is set, leading zeros of ranges are ignored
+            ("0001-0003", ["1", "2", "3"]),
+            ("08-11", ["8", "9", "10", "11"]),
+            ("08-11(width=2)", ["08", "09", "10", "11"]),
+            ("0-2", ["0", "1", "2"]),
+            ("1-3(width=3)", ["001", "002", "003"]),
+            ("0001-0003(width=2)", ["01", "02", "03"]),
+            ("*NUMERIC(count=2,width=3)", ["001", "002"]),
+            ("*NUMERIC(count=2,width=3,pad=_)", ["__1", "__2"]),
+            ("*NUMERIC(start=9,count=2,width=1)", ["9", "10"]),
+        ]
+
+        for dim, expected in cases:
+            with self.subTest(dim):
+                self.assertListEqual(expected, get_dimension_values(dim, None))
+
 
 class AlphaGeneratorTestCase(unittest.TestCase):
     def test_integration(self):
@@ -33,6 +60,8 @@ class AlphaGeneratorTestCase(unittest.TestCase):
         self.assertListEqual(["b", "d", "f"], get_dimension_values("*ALPHA(start=B,end=F,step=2)", None))
         self.assertListEqual(["C", "E", "G", "I"], get_dimension_values(
             "*ALPHA(casing=upper,start=C,end=I,step=2)", None))
+        self.assertListEqual(["ZZA", "ZZB", "ZZC"], get_dimension_values("*ALPHA(casing=upper,start=ZZA,count=3)", None))
+        self.assertListEqual(["zzy", "zzz", "aaaa"], get_dimension_values("zzy-aaaa", None))
 
     def test_is_generator(self):
         self.assertFalse(AlphaGenerator.is_generator("1", "2"))
@@ -47,3 +76,11 @@ class AlphaGeneratorTestCase(unittest.TestCase):
     def test_generator(self):
         gen = AlphaGenerator(GeneratorTypes.RANGE, ("X", "AC"), {}, "X-AC")
         self.assertListEqual(["X", "Y", "Z", "AA", "AB", "AC"], list(islice(gen.generator(), 23, 29)))
+
+    def test_unrank(self):
+        gen = AlphaGenerator(GeneratorTypes.RANGE, ("A", "Z"), {}, "A-Z")
+        self.assertListEqual(list(islice(gen.generator(), 0, 1000)), [gen.unrank(i) for i in range(1000)])
+
+        for value in ["A", "Z", "AA", "ABX", "ZZZ", "AAAA"]:
+            with self.subTest(value):
+                self.assertEqual(value, gen.unrank(gen.get_index(value)))
@@ -1,6 +1,6 @@
 import unittest
 
-from ...BulkGenerator.template import Template, to_csv, from_csv, to_json, from_json
+from ...BulkGenerator.template import Template, template_cache, render_layered, to_csv, from_csv, to_json, from_json
 
 
 class TemplateFiltersTestCase(unittest.TestCase):
@@ -52,3 +52,34 @@ class TemplateTestCase(unittest.TestCase):
     "d": "dd"
   }
 ]""")
+
+    def test_compile_cache(self):
+        template_cache.cache_clear()
+
+        first = Template("{{a}}-cache").compile()
+        second = Template("{{a}}-cache").compile()
+        self.assertIs(first, second)
+        self.assertEqual((1, 1), (template_cache.cache_info().hits, template_cache.cache_info().misses))
+
+        # different globals should result in a different compiled template
+        ctx_first, ctx_second = {"b": object()}, {"b": object()}
+        self.assertIs(Template("{{b}}", ctx=ctx_first).compile(), Template("{{b}}", ctx=ctx_first).compile())
+        self.assertIsNot(Template("{{b}}", ctx=ctx_first).compile(), Template("{{b}}", ctx=ctx_second).compile())
+
+    def test_compile_expression(self):
+        self.assertEqual(6, Template("{{a * 2}}").compile_expression()(a=3))
+        self.assertIs(True, Template("{{ a > 2 }}").compile_expression()(a=3))
+
+        # templates which are no single expression cannot be compiled as expression
+        for template in ["true", "{{a}}-{{b}}", "{{- a }}", "{% if a %}{{a}}{% endif %}", "{{a, b}}"]:
+            with self.subTest(template):
+                self.assertIsNone(Template(template).compile_expression())
+
+    def test_render_layered(self):
+        template = Template("{{a}}-{{b}}-{{ 'x'|to_json }}").compile()
+        static = {"a": 1, "b": 2}
+        self.assertEqual('1-3-"x"', render_layered(template, {"b": 3}, static))
+        self.assertEqual('1-2-"x"', render_layered(template, static))
+
+        # the layers are not modified by rendering
+        self.assertEqual({"a": 1, "b": 2}, static)